@@ -1,6 +1,9 @@
 # app/__init__.py - Updated with explicit template folder
 """Flask application factory"""
+import logging
 import os
+import threading
+import time
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
@@ -9,8 +12,18 @@ from config import config
 db = SQLAlchemy()
 
 
-def create_app(config_name='default'):
-    """Application factory"""
+def create_app(config_name='default', overrides=None):
+    """Application factory (overrides, if given, are applied on top of the config)"""
+    started = last = time.perf_counter()
+    timings = {}
+    
+    def phase(name):
+        """Record the milliseconds since the previous phase ended"""
+        nonlocal last
+        now = time.perf_counter()
+        timings[name] = round((now - last) * 1000, 1)
+        last = now
+    
     # Get the base directory
     base_dir = os.path.abspath(os.path.dirname(__file__))
     
@@ -20,18 +33,65 @@ def create_app(config_name='default'):
                 static_folder=os.path.join(base_dir, '..', 'static'))
     
     app.config.from_object(config[config_name])
+    app.config.update(overrides or {})
+    
+    # Client addresses from X-Forwarded-For, set by the proxies in front of the app
+    if app.config.get('PROXY_COUNT'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        count = app.config['PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=count, x_proto=count, x_host=count)
+    
+    from app.utils.log import configure_logging
+    configure_logging(app)
+    phase('config')
     
     # Initialize extensions
     db.init_app(app)
     CORS(app)  # Enable CORS for all routes
     
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    from app.utils.stats_db import init_stats_db
+    init_stats_db(app)
+    
+    from app.utils.health import init_health
+    init_health(app)
+    
+    from app.services.game_cache import init_game_cache
+    init_game_cache(app)
+    phase('extensions')
+    
     # Register blueprints
     from app.routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
+    phase('blueprints')
     
-    # Create database tables
+    # One query to compare schema versions; upgrading is left to `flask upgrade-db`
+    # unless SCHEMA_AUTO_UPGRADE is on (development and testing)
+    from app.migrations import ensure_schema, LATEST_VERSION
     with app.app_context():
-        db.create_all()
+        schema_version = ensure_schema(app.config.get('SCHEMA_AUTO_UPGRADE', False))
+    if schema_version < LATEST_VERSION and not app.config.get('SCHEMA_AUTO_UPGRADE', False):
+        logging.getLogger(__name__).error(
+            "Database schema is at version %s, the app needs %s: run flask upgrade-db",
+            schema_version, LATEST_VERSION
+        )
+    phase('schema')
+    
+    from app.cli import register_commands
+    register_commands(app)
+    phase('commands')
+    
+    # The checkout tables take about half a second each to build, so do it off the startup path
+    if app.config.get('WARM_CHECKOUT_TABLE', True):
+        from app.services.checkout_table import build_all
+        threading.Thread(target=build_all, name='checkout-table', daemon=True).start()
+    
+    # Requests only read expected-darts tables; missing ones are built here or by `flask build-dp-tables`
+    if app.config.get('WARM_DP_TABLES', False):
+        from app.services.expected_darts import warm_tables
+        threading.Thread(target=warm_tables, args=(app,), name='dp-tables', daemon=True).start()
     
     @app.route('/')
     def index():
@@ -51,4 +111,13 @@ def create_app(config_name='default'):
     def internal_error(error):
         return {'error': 'Internal server error'}, 500
     
+    phase('routes')
+    timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+    app.extensions['startup_timings'] = timings
+    logging.getLogger(__name__).info("startup", extra={'fields': {
+        'config_name': config_name,
+        'schema_version': schema_version,
+        **{f'{name}_ms': ms for name, ms in timings.items()}
+    }})
+    
     return app
\ No newline at end of file
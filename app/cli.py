@@ -0,0 +1,94 @@
+"""Flask CLI commands for schema maintenance and precomputed tables"""
+from datetime import datetime
+
+import click
+from flask import Flask
+
+from app import db
+
+
+def hot_queries():
+    """(name, statement) pairs for the queries run on every dart and stats page"""
+    from app.models import Match, Leg, Turn, Throw, PlayerDayStats
+    
+    since = datetime(2000, 1, 1)
+    return [
+        ('process_throw: duplicate dart check',
+         db.select(Throw.id).where(Throw.turn_id == 1, Throw.dart_number == 1).limit(1)),
+        ('undo_last_throw: throws in current turn',
+         db.select(Throw).where(Throw.turn_id == 1)),
+        ('undo_last_throw: previous turn in leg',
+         db.select(Turn.id).where(Turn.leg_id == 1, Turn.turn_number < 10)
+         .order_by(Turn.turn_number.desc()).limit(1)),
+        ('get_current_game_state: turns in leg',
+         db.select(Turn).where(Turn.leg_id == 1).order_by(Turn.turn_number)),
+        ('get_player_current_score: non-bust turns',
+         db.select(Turn.score).where(Turn.leg_id == 1, Turn.player_id == 1, Turn.is_bust == False)),
+        ('get_current_leg: active legs for match',
+         db.select(Leg.id).where(Leg.match_id == 1, Leg.status == 'active')),
+        ('get_matches: keyset page',
+         db.select(Match.id).where(Match.status == 'completed', Match.start_time < since)
+         .order_by(Match.start_time.desc(), Match.id.desc()).limit(51)),
+        ('get_leaderboard: turn totals per player',
+         db.select(Turn.player_id, db.func.sum(Turn.score))
+         .join(Leg, Turn.leg_id == Leg.id).join(Match, Leg.match_id == Match.id)
+         .where(Match.start_time >= since).group_by(Turn.player_id)),
+        ('get_player_stats: daily rollup rows for player',
+         db.select(db.func.sum(PlayerDayStats.darts))
+         .where(PlayerDayStats.player_id == 1, PlayerDayStats.day >= since.date())),
+    ]
+
+
+def explain(statement):
+    """Query plan rows for a statement on the current database"""
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    return db.session.execute(db.text(prefix + sql)).fetchall()
+
+
+def register_commands(app: Flask):
+    """Attach the schema commands to the app's CLI"""
+    
+    @app.cli.command('upgrade-db')
+    @click.option('--to', 'target', type=int, default=None, help='Stop at this schema version')
+    def upgrade_db(target):
+        """Create missing tables and apply pending schema migrations"""
+        from app.migrations import upgrade, get_schema_version
+        
+        applied = upgrade(target)
+        for version, description in applied:
+            click.echo(f'Applied {version}: {description}')
+        click.echo(f'Schema version {get_schema_version()}')
+    
+    @app.cli.command('schema-version')
+    def schema_version():
+        """Show the stored and latest schema versions"""
+        from app.migrations import get_schema_version, LATEST_VERSION
+        
+        click.echo(f'Schema version {get_schema_version()} (latest {LATEST_VERSION})')
+    
+    @app.cli.command('explain-hot-queries')
+    def explain_hot_queries():
+        """Print the query plan for each hot scoring and stats query"""
+        for name, statement in hot_queries():
+            click.echo(f'-- {name}')
+            for row in explain(statement):
+                click.echo('   ' + ' | '.join(str(value) for value in row))
+    
+    @app.cli.command('cache-broker')
+    @click.option('--address', default='127.0.0.1:7390', show_default=True, help='host:port to listen on')
+    def cache_broker(address):
+        """Relay game cache invalidations and live events between workers (local stand-in for a broker)"""
+        from app.services.game_cache import InvalidationRelay
+        
+        click.echo(f'Relaying game cache invalidations and live events on {address}')
+        with InvalidationRelay(address) as relay:
+            relay.serve_forever()
+    
+    @app.cli.command('build-dp-tables')
+    def build_dp_tables():
+        """Precompute the expected-darts table for every skill bucket"""
+        from app.services.expected_darts import build_all_tables
+        
+        click.echo(f'Built {build_all_tables()} expected-darts tables')
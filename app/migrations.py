@@ -0,0 +1,296 @@
+"""Versioned schema migrations
+
+create_all() only creates missing tables, so changes to existing tables
+(indexes, constraints, columns) are applied here in order. The highest
+applied version is stored in the schema_version table.
+
+Run `flask upgrade-db` once per deploy, before starting the workers. App
+startup only reads the stored version and logs an error when it is behind
+LATEST_VERSION; with SCHEMA_AUTO_UPGRADE on (the development and testing
+default) it upgrades instead. Upgrades hold a database advisory lock, so
+workers starting together apply each migration once. create_all() only
+runs as part of an upgrade, so a new table needs a migration too, or
+databases already at the latest version will never get it.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app import db
+
+schema_version = db.Table(
+    'schema_version',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(255), nullable=False),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow)
+)
+
+
+def _model_index(name):
+    """Look up an index declared in a model's __table_args__ by name"""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f'No index named {name}')
+
+
+# Migration 1's indexes as they were then, not read from the models: migration 4
+# later makes ix_turns_leg_turn_number unique, after checking for duplicates
+_HOT_PATH_INDEXES = [
+    ('ix_turns_leg_turn_number', 'turns', ('leg_id', 'turn_number'), False),
+    ('ix_turns_leg_player_bust', 'turns', ('leg_id', 'player_id', 'is_bust'), False),
+    ('ix_turns_player_leg', 'turns', ('player_id', 'leg_id'), False),
+    ('uq_throws_turn_dart', 'throws', ('turn_id', 'dart_number'), True),
+    ('ix_legs_match_status', 'legs', ('match_id', 'status'), False),
+    ('ix_legs_winning_player', 'legs', ('winning_player_id',), False),
+    ('ix_matches_start_time_id', 'matches', ('start_time', 'id'), False),
+    ('ix_matches_status_start_time', 'matches', ('status', 'start_time'), False),
+    ('ix_player_matches_match', 'player_matches', ('match_id',), False),
+]
+
+
+def _add_hot_path_indexes(connection):
+    """Composite indexes for the scoring and stats queries, one dart per slot per turn"""
+    duplicates = connection.execute(db.text(
+        'SELECT turn_id, dart_number, COUNT(*) FROM throws '
+        'GROUP BY turn_id, dart_number HAVING COUNT(*) > 1'
+    )).fetchall()
+    if duplicates:
+        listed = ', '.join(f'turn {turn_id} dart {dart}' for turn_id, dart, _ in duplicates[:10])
+        raise RuntimeError(f'Remove duplicate throws before upgrading: {listed}')
+    
+    # Reflected into a metadata of their own, so the models' tables are left alone
+    metadata = db.MetaData()
+    for name, table_name, columns, unique in _HOT_PATH_INDEXES:
+        table = metadata.tables.get(table_name)
+        if table is None:
+            table = db.Table(table_name, metadata, autoload_with=connection)
+        db.Index(name, *(table.c[column] for column in columns), unique=unique).create(connection, checkfirst=True)
+
+
+def _add_columns(connection, table_name, column_names):
+    """Add model columns missing from an existing table (new tables already have them)"""
+    existing = {column['name'] for column in db.inspect(connection).get_columns(table_name)}
+    table = db.metadata.tables[table_name]
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f'ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(connection.dialect)}'
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+        connection.execute(db.text(ddl))
+
+
+def _add_cricket_marks(connection):
+    """Packed cricket marks per player and marks added per dart"""
+    _add_columns(connection, 'leg_player_states', ['marks'])
+    _add_columns(connection, 'throws', ['marks'])
+
+
+def _widen_game_types(connection):
+    """Allow every X01 variant in matches.game_type (SQLite does not enforce the enum)"""
+    if connection.dialect.name != 'mysql':
+        return
+    column = db.metadata.tables['matches'].c.game_type
+    connection.execute(db.text(
+        f'ALTER TABLE matches MODIFY game_type {column.type.compile(connection.dialect)} NOT NULL'
+    ))
+
+
+def _unique_turn_numbers(connection):
+    """One turn per turn number in a leg, so concurrent writers cannot both start a turn"""
+    duplicates = connection.execute(db.text(
+        'SELECT leg_id, turn_number, COUNT(*) FROM turns '
+        'GROUP BY leg_id, turn_number HAVING COUNT(*) > 1'
+    )).fetchall()
+    if duplicates:
+        listed = ', '.join(f'leg {leg_id} turn {turn_number}' for leg_id, turn_number, _ in duplicates[:10])
+        raise RuntimeError(f'Remove duplicate turns before upgrading: {listed}')
+    
+    index = _model_index('ix_turns_leg_turn_number')
+    existing = {found['name']: found for found in db.inspect(connection).get_indexes('turns')}
+    if index.name in existing:
+        if existing[index.name].get('unique'):
+            return
+        index.drop(connection)
+    index.create(connection)
+
+
+def _add_leg_versions(connection):
+    """Per-turn change versions and the last turn removal per leg, for game state deltas"""
+    _add_columns(connection, 'turns', ['version'])
+    _add_columns(connection, 'leg_states', ['reset_version'])
+
+
+
+def _add_player_day_stats(connection):
+    """Per-player, per-day statistics rollup, filled from the recorded X01 turns"""
+    from app.models.player_day_stats import OPENING_VISITS, PlayerDayStats
+    from app.services import x01
+    
+    _add_columns(connection, 'leg_player_states', ['visits'])
+    connection.execute(db.text(
+        'UPDATE leg_player_states SET visits = (SELECT COUNT(*) FROM turns '
+        'WHERE turns.leg_id = leg_player_states.leg_id AND turns.player_id = leg_player_states.player_id)'
+    ))
+    
+    table = PlayerDayStats.__table__
+    table.create(connection, checkfirst=True)
+    connection.execute(table.delete())
+    
+    tables = db.metadata.tables
+    turns, throws, legs, matches = tables['turns'], tables['throws'], tables['legs'], tables['matches']
+    doubles = db.select(
+        throws.c.turn_id,
+        db.func.sum(db.case((throws.c.multiplier == x01.DOUBLE, 1), else_=0)).label('attempted'),
+        db.func.sum(db.case(((throws.c.multiplier == x01.DOUBLE) & (throws.c.segment > 0), 1), else_=0)).label('hit')
+    ).group_by(throws.c.turn_id).subquery()
+    rows = connection.execute(db.select(
+        turns.c.leg_id, turns.c.player_id, turns.c.score, turns.c.remaining_score, turns.c.darts_thrown,
+        turns.c.is_bust, turns.c.is_checkout, db.func.coalesce(turns.c.created_at, matches.c.start_time),
+        db.func.coalesce(doubles.c.attempted, 0), db.func.coalesce(doubles.c.hit, 0)
+    ).join(legs, turns.c.leg_id == legs.c.id).join(matches, legs.c.match_id == matches.c.id).outerjoin(
+        doubles, doubles.c.turn_id == turns.c.id
+    ).where(
+        matches.c.game_type.in_(tuple(x01.VARIANTS))
+    ).order_by(turns.c.leg_id, turns.c.turn_number))
+    
+    visits = {}
+    days = {}
+    for leg_id, player_id, score, remaining, darts, bust, checkout, created_at, attempted, hit in rows:
+        visit = visits[leg_id, player_id] = visits.get((leg_id, player_id), 0) + 1
+        day = (created_at or datetime.utcnow()).date()
+        totals = days.get((player_id, day))
+        if totals is None:
+            totals = days[player_id, day] = dict(
+                {name: 0 for name in PlayerDayStats.COUNTERS + PlayerDayStats.BESTS}, player_id=player_id, day=day
+            )
+        score, darts = score or 0, darts or 0
+        totals['darts'] += darts
+        totals['points'] += score
+        totals['doubles_attempted'] += attempted
+        totals['doubles_hit'] += hit
+        if PlayerDayStats.visit_over(darts, bust, checkout):
+            totals['best_visit'] = max(totals['best_visit'], score)
+        if checkout:
+            totals['checkouts'] += 1
+            totals['best_finish'] = max(totals['best_finish'], remaining + score)
+        if visit <= OPENING_VISITS:
+            totals[f'visit{visit}_points'] += score
+            totals[f'visit{visit}_darts'] += darts
+    
+    if days:
+        connection.execute(table.insert(), list(days.values()))
+
+
+# (version, description, apply(connection)) in the order they must run
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'Composite indexes for the scoring hot path', _add_hot_path_indexes),
+    (2, 'Cricket marks on leg player states and throws', _add_cricket_marks),
+    (3, 'X01 variant game types', _widen_game_types),
+    (4, 'Unique turn numbers per leg', _unique_turn_numbers),
+    (5, 'Turn versions for game state deltas', _add_leg_versions),
+    (6, 'Player statistics rollup by day', _add_player_day_stats),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Advisory lock held while upgrading (GET_LOCK name on MySQL, pg_advisory_lock key on PostgreSQL)
+UPGRADE_LOCK_NAME = 'darts_schema_upgrade'
+UPGRADE_LOCK_KEY = 7390001
+
+
+def get_schema_version(connection=None) -> int:
+    """Highest applied migration version (0 if none)"""
+    if connection is None:
+        with db.engine.connect() as connection:
+            return get_schema_version(connection)
+    
+    if not db.inspect(connection).has_table('schema_version'):
+        return 0
+    return connection.execute(db.select(db.func.max(schema_version.c.version))).scalar() or 0
+
+
+def stored_version() -> int:
+    """The stored schema version in one query (0 if there is no schema_version table yet)"""
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(db.select(db.func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def ensure_schema(auto_upgrade: bool = False) -> int:
+    """Check the schema version at startup, returning the version found
+
+    Costs one query. With auto_upgrade on, a database that is behind is
+    upgraded too; otherwise the caller is expected to report it so that
+    `flask upgrade-db` gets run.
+    """
+    version = stored_version()
+    if version < LATEST_VERSION and auto_upgrade:
+        upgrade()
+    return version
+
+
+@contextmanager
+def upgrade_lock(timeout: int = 600):
+    """Hold the database's advisory lock for schema upgrades (MySQL and PostgreSQL)
+
+    Other processes upgrading at the same time wait here, then find the
+    migrations already applied. SQLite locks the whole file on write, so it
+    goes without.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in ('mysql', 'postgresql'):
+        yield
+        return
+    
+    with db.engine.connect() as connection:
+        if dialect == 'mysql':
+            acquired = connection.execute(
+                db.text('SELECT GET_LOCK(:name, :timeout)'), {'name': UPGRADE_LOCK_NAME, 'timeout': timeout}
+            ).scalar()
+            if acquired != 1:
+                raise RuntimeError(f'Timed out after {timeout}s waiting for another schema upgrade')
+        else:
+            connection.execute(db.text(f'SET LOCAL lock_timeout = {int(timeout) * 1000}'))
+            connection.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': UPGRADE_LOCK_KEY})
+        connection.commit()
+        try:
+            yield
+        finally:
+            if dialect == 'mysql':
+                connection.execute(db.text('SELECT RELEASE_LOCK(:name)'), {'name': UPGRADE_LOCK_NAME})
+            else:
+                connection.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': UPGRADE_LOCK_KEY})
+            connection.commit()
+
+
+def upgrade(target: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Create missing tables and apply migrations above the stored version, each in its own transaction"""
+    target = LATEST_VERSION if target is None else target
+    
+    applied = []
+    with upgrade_lock():
+        db.create_all()
+        schema_version.create(db.engine, checkfirst=True)
+        for version, description, apply in MIGRATIONS:
+            if version > target:
+                break
+            with db.engine.begin() as connection:
+                if version <= get_schema_version(connection):
+                    continue
+                apply(connection)
+                connection.execute(schema_version.insert().values(
+                    version=version,
+                    description=description,
+                    applied_at=datetime.utcnow()
+                ))
+            applied.append((version, description))
+    
+    return applied
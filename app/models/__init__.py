@@ -7,5 +7,7 @@ from app.models.match import Match, PlayerMatch
 from app.models.leg import Leg
 from app.models.turn import Turn
 from app.models.throw import Throw
+from app.models.leg_state import LegState, LegPlayerState
+from app.models.player_day_stats import PlayerDayStats
 
-__all__ = ['Player', 'Match', 'PlayerMatch', 'Leg', 'Turn', 'Throw']
\ No newline at end of file
+__all__ = ['Player', 'Match', 'PlayerMatch', 'Leg', 'Turn', 'Throw', 'LegState', 'LegPlayerState', 'PlayerDayStats']
\ No newline at end of file
@@ -2,11 +2,16 @@
 """Leg model"""
 from datetime import datetime
 from app import db
+from app.utils.serialization import select_fields
 
 
 class Leg(db.Model):
     """Leg model for darts scoring system"""
     __tablename__ = 'legs'
+    __table_args__ = (
+        db.Index('ix_legs_match_status', 'match_id', 'status'),
+        db.Index('ix_legs_winning_player', 'winning_player_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
@@ -24,13 +29,15 @@ class Leg(db.Model):
     starting_player = db.relationship('Player', foreign_keys=[starting_player_id])
     winning_player = db.relationship('Player', foreign_keys=[winning_player_id])
     turns = db.relationship('Turn', back_populates='leg', cascade='all, delete-orphan')
+    state = db.relationship('LegState', back_populates='leg', uselist=False, cascade='all, delete-orphan')
+    player_states = db.relationship('LegPlayerState', back_populates='leg', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Leg {self.leg_number} of Match {self.match_id}>'
     
-    def to_dict(self):
-        """Convert leg to dictionary"""
-        return {
+    def to_dict(self, include=('turns', 'throws'), fields=None):
+        """Convert leg to dictionary, nesting turns (and their throws) if included"""
+        data = {
             'id': self.id,
             'match_id': self.match_id,
             'leg_number': self.leg_number,
@@ -38,9 +45,11 @@ class Leg(db.Model):
             'winning_player_id': self.winning_player_id,
             'status': self.status,
             'start_time': self.start_time.isoformat() if self.start_time else None,
-            'end_time': self.end_time.isoformat() if self.end_time else None,
-            'turns': [turn.to_dict() for turn in self.turns]
+            'end_time': self.end_time.isoformat() if self.end_time else None
         }
+        if 'turns' in include:
+            data['turns'] = [turn.to_dict(include, fields) for turn in self.turns]
+        return select_fields(data, fields, 'legs')
     
     def complete(self, winning_player_id):
         """Mark leg as completed"""
@@ -52,11 +61,14 @@ class Leg(db.Model):
     @classmethod
     def create_for_match(cls, match_id, leg_number, starting_player_id):
         """Create a new leg for a match"""
+        from app.models.leg_state import LegState
+        
         leg = cls(
             match_id=match_id,
             leg_number=leg_number,
             starting_player_id=starting_player_id
         )
+        leg.state = LegState(last_turn_number=0, version=0)
         db.session.add(leg)
         db.session.commit()
         return leg
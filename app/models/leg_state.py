@@ -0,0 +1,155 @@
+"""Denormalized leg state models"""
+from datetime import datetime
+from app import db
+
+
+class LegState(db.Model):
+    """Running state for a leg, maintained alongside every throw and undo"""
+    __tablename__ = 'leg_states'
+
+    leg_id = db.Column(db.Integer, db.ForeignKey('legs.id'), primary_key=True)
+    current_turn_id = db.Column(db.Integer, db.ForeignKey('turns.id'))
+    last_turn_number = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Version at which a turn was last deleted: deltas from before it need the full state
+    reset_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    leg = db.relationship('Leg', back_populates='state')
+
+    # Every change to a leg bumps its version, and the UPDATE only matches the
+    # version that was read, so a write that lost a race raises StaleDataError
+    __mapper_args__ = {
+        'version_id_col': version,
+        'version_id_generator': False
+    }
+
+    def __repr__(self):
+        return f'<LegState leg:{self.leg_id} v{self.version}>'
+
+    def to_dict(self):
+        """Convert leg state to dictionary"""
+        return {
+            'leg_id': self.leg_id,
+            'current_turn_id': self.current_turn_id,
+            'last_turn_number': self.last_turn_number,
+            'version': self.version
+        }
+
+    def bump(self, turn=None):
+        """Advance the version after a change to the leg, stamping the turn that changed"""
+        self.version = (self.version or 0) + 1
+        if turn is not None:
+            turn.version = self.version
+
+    def can_diff_from(self, version):
+        """Whether the turns changed since version describe everything that happened after it"""
+        return (self.reset_version or 0) <= version <= self.version
+
+    @classmethod
+    def get_or_create(cls, leg_id, starting_score, lock=False):
+        """Get the state for a leg, building it from its turns the first time
+
+        lock=True reads it with SELECT ... FOR UPDATE, so writes to the same
+        leg queue behind each other until commit while other legs carry on.
+        """
+        state = db.session.get(cls, leg_id, with_for_update=True if lock else None)
+        if state is None:
+            state = cls.rebuild(leg_id, starting_score)
+        return state
+
+    @classmethod
+    def rebuild(cls, leg_id, starting_score):
+        """Build leg and player state from the recorded turns (legs that predate it)"""
+        from app.models.turn import Turn
+
+        state = db.session.get(cls, leg_id)
+        if state is None:
+            state = cls(leg_id=leg_id, last_turn_number=0, version=0)
+            db.session.add(state)
+
+        turns = Turn.query.filter_by(leg_id=leg_id).order_by(Turn.turn_number).all()
+        player_states = {}
+        for turn in turns:
+            player_state = player_states.get(turn.player_id)
+            if player_state is None:
+                player_state = LegPlayerState.query.filter_by(
+                    leg_id=leg_id,
+                    player_id=turn.player_id
+                ).first()
+                if player_state is None:
+                    player_state = LegPlayerState(leg_id=leg_id, player_id=turn.player_id)
+                    db.session.add(player_state)
+                player_state.remaining_score = starting_score
+                player_state.darts_thrown = 0
+                player_state.visits = 0
+                player_states[turn.player_id] = player_state
+
+            player_state.darts_thrown += turn.darts_thrown or 0
+            player_state.visits += 1
+            if not turn.is_bust:
+                player_state.remaining_score -= turn.score or 0
+
+        if turns:
+            state.current_turn_id = turns[-1].id
+            state.last_turn_number = turns[-1].turn_number
+        else:
+            state.current_turn_id = None
+            state.last_turn_number = 0
+
+        db.session.flush()
+        return state
+
+
+class LegPlayerState(db.Model):
+    """Running score for one player in one leg"""
+    __tablename__ = 'leg_player_states'
+
+    leg_id = db.Column(db.Integer, db.ForeignKey('legs.id'), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    remaining_score = db.Column(db.Integer, nullable=False)  # Points scored so far in cricket
+    darts_thrown = db.Column(db.Integer, nullable=False, default=0)
+    marks = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Packed cricket marks
+    visits = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Turns started in the leg
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    leg = db.relationship('Leg', back_populates='player_states')
+
+    def __repr__(self):
+        return f'<LegPlayerState leg:{self.leg_id} player:{self.player_id} remaining:{self.remaining_score}>'
+
+    def to_dict(self):
+        """Convert player state to dictionary"""
+        return {
+            'leg_id': self.leg_id,
+            'player_id': self.player_id,
+            'remaining_score': self.remaining_score,
+            'darts_thrown': self.darts_thrown,
+            'marks': self.marks,
+            'visits': self.visits,
+            'version': self.version
+        }
+
+    def bump(self):
+        """Advance the version after a change to this player's score"""
+        self.version = (self.version or 0) + 1
+
+    @classmethod
+    def get_or_create(cls, leg_id, player_id, starting_score):
+        """Get a player's state in a leg, starting them on starting_score if new"""
+        state = db.session.get(cls, (leg_id, player_id))
+        if state is None:
+            state = cls(
+                leg_id=leg_id,
+                player_id=player_id,
+                remaining_score=starting_score,
+                darts_thrown=0,
+                marks=0,
+                visits=0,
+                version=0
+            )
+            db.session.add(state)
+        return state
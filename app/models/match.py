@@ -3,6 +3,11 @@
 from datetime import datetime
 from enum import Enum
 from app import db
+from app.services import x01
+from app.utils.serialization import select_fields
+
+# Every X01 variant ('501', '301-di', '701-di-mo', ...) plus cricket
+GAME_TYPES = tuple(x01.VARIANTS) + ('cricket',)
 
 
 class GameType(Enum):
@@ -34,12 +39,20 @@ class LegStatus(Enum):
         return self.value
 
 
+# Nesting used by Match.to_dict() when no include is given
+FULL_DEPTH = ('players', 'legs', 'turns', 'throws')
+
+
 class Match(db.Model):
     """Match model for darts scoring system"""
     __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_start_time_id', 'start_time', 'id'),
+        db.Index('ix_matches_status_start_time', 'status', 'start_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    game_type = db.Column(db.Enum('501', 'cricket'), nullable=False, default='501')  # Use strings directly
+    game_type = db.Column(db.Enum(*GAME_TYPES), nullable=False, default='501')  # Use strings directly
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime)
     status = db.Column(db.Enum('active', 'completed', 'abandoned'), default='active')  # Use strings directly
@@ -53,18 +66,41 @@ class Match(db.Model):
     def __repr__(self):
         return f'<Match {self.id} - {self.game_type}>'
     
-    def to_dict(self):
-        """Convert match to dictionary"""
-        return {
+    def to_dict(self, include=FULL_DEPTH, fields=None):
+        """Convert match to dictionary, nesting players/legs/turns/throws if included"""
+        data = {
             'id': self.id,
             'game_type': self.game_type,
             'start_time': self.start_time.isoformat() if self.start_time else None,
             'end_time': self.end_time.isoformat() if self.end_time else None,
             'status': self.status,
-            'players': [pm.player.to_dict() for pm in self.player_matches],
-            'legs': [leg.to_dict() for leg in self.legs],
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if 'players' in include:
+            data['players'] = [
+                select_fields(pm.player.to_dict(), fields, 'players') for pm in self.player_matches
+            ]
+        if 'legs' in include:
+            data['legs'] = [leg.to_dict(include, fields) for leg in self.legs]
+        return select_fields(data, fields)
+    
+    @staticmethod
+    def loader_options(include):
+        """Eager loading options matching the depth to_dict will serialize"""
+        from app.models.leg import Leg
+        from app.models.turn import Turn
+        
+        options = []
+        if 'players' in include:
+            options.append(db.selectinload(Match.player_matches).joinedload(PlayerMatch.player))
+        if 'legs' in include:
+            legs = db.selectinload(Match.legs)
+            if 'turns' in include:
+                legs = legs.selectinload(Leg.turns)
+                if 'throws' in include:
+                    legs = legs.selectinload(Turn.throws)
+            options.append(legs)
+        return options
     
     def complete(self):
         """Mark match as completed"""
@@ -75,7 +111,12 @@ class Match(db.Model):
     @classmethod
     def create_501_match(cls, player_ids):
         """Create a new 501 match with players"""
-        match = cls(game_type='501')  # Use string directly
+        return cls.create_match(player_ids, '501')
+    
+    @classmethod
+    def create_match(cls, player_ids, game_type):
+        """Create a new match of any game type with players"""
+        match = cls(game_type=game_type)  # Use string directly
         db.session.add(match)
         
         # Add players to match
@@ -100,6 +141,9 @@ class Match(db.Model):
 class PlayerMatch(db.Model):
     """Many-to-many relationship between players and matches"""
     __tablename__ = 'player_matches'
+    __table_args__ = (
+        db.Index('ix_player_matches_match', 'match_id'),
+    )
     
     player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
     match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), primary_key=True)
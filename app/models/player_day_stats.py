@@ -0,0 +1,147 @@
+"""Per-player, per-day statistics rollup model"""
+from datetime import datetime, timedelta
+from app import db
+from app.services import x01
+
+# Opening visits with their own totals, for the first-3 ... first-12 averages
+OPENING_VISITS = 4
+
+
+class PlayerDayStats(db.Model):
+    """One player's X01 totals for one day, maintained alongside every throw and undo
+
+    The day is the UTC date the turn started. Points follow turn scores, so a
+    bust takes back the points of the darts before it in that turn. The best
+    visit only counts visits that are over (three darts, a bust or a
+    checkout), with their final score.
+    """
+    __tablename__ = 'player_day_stats'
+
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    darts = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    doubles_attempted = db.Column(db.Integer, nullable=False, default=0)
+    doubles_hit = db.Column(db.Integer, nullable=False, default=0)
+    checkouts = db.Column(db.Integer, nullable=False, default=0)
+    best_visit = db.Column(db.Integer, nullable=False, default=0)
+    best_finish = db.Column(db.Integer, nullable=False, default=0)
+    # Points and darts in each leg's first, second, third and fourth visit
+    visit1_points = db.Column(db.Integer, nullable=False, default=0)
+    visit1_darts = db.Column(db.Integer, nullable=False, default=0)
+    visit2_points = db.Column(db.Integer, nullable=False, default=0)
+    visit2_darts = db.Column(db.Integer, nullable=False, default=0)
+    visit3_points = db.Column(db.Integer, nullable=False, default=0)
+    visit3_darts = db.Column(db.Integer, nullable=False, default=0)
+    visit4_points = db.Column(db.Integer, nullable=False, default=0)
+    visit4_darts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    COUNTERS = ('darts', 'points', 'doubles_attempted', 'doubles_hit', 'checkouts') + tuple(
+        f'visit{visit}_{total}' for visit in range(1, OPENING_VISITS + 1) for total in ('points', 'darts')
+    )
+    BESTS = ('best_visit', 'best_finish')
+
+    def __repr__(self):
+        return f'<PlayerDayStats player:{self.player_id} {self.day} darts:{self.darts}>'
+
+    @staticmethod
+    def day_of(turn):
+        """The day a turn's darts are counted on"""
+        return (turn.created_at or datetime.utcnow()).date()
+
+    @staticmethod
+    def visit_over(darts_thrown, is_bust, is_checkout):
+        """Whether a visit has finished, so its score is final"""
+        return bool(darts_thrown >= x01.DARTS_PER_TURN or is_bust or is_checkout)
+
+    @staticmethod
+    def dart_changes(segment, multiplier, score_change, visit_number, sign=1):
+        """Counter changes for adding (sign=1) or taking back (sign=-1) one dart
+
+        score_change is how much the dart moved its turn's score (a bust
+        takes the turn back to 0).
+        """
+        changes = {'darts': sign, 'points': score_change}
+        if multiplier == x01.DOUBLE:
+            changes['doubles_attempted'] = sign
+            if segment > 0:
+                changes['doubles_hit'] = sign
+        if 1 <= visit_number <= OPENING_VISITS:
+            changes[f'visit{visit_number}_points'] = score_change
+            changes[f'visit{visit_number}_darts'] = sign
+        return changes
+
+    def apply(self, changes):
+        for name, amount in changes.items():
+            setattr(self, name, getattr(self, name) + amount)
+
+    @classmethod
+    def add_dart(cls, player_id, day, changes, visit_score=None, finish=None):
+        """Count a dart with one UPDATE that raises the bests in SQL, inserting the day's row if missing
+
+        visit_score is the final score of a visit the dart ended (None while
+        the visit is still open). Nothing is read first, so the hot path
+        costs a single statement.
+        """
+        if finish is not None:
+            changes = dict(changes, checkouts=1)
+        values = {name: getattr(cls, name) + amount for name, amount in changes.items()}
+        if visit_score is not None:
+            values['best_visit'] = db.case((cls.best_visit < visit_score, visit_score), else_=cls.best_visit)
+        if finish is not None:
+            values['best_finish'] = db.case((cls.best_finish < finish, finish), else_=cls.best_finish)
+        values['updated_at'] = datetime.utcnow()
+
+        result = db.session.execute(
+            db.update(cls).where(cls.player_id == player_id, cls.day == day).values(values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            stats = cls(player_id=player_id, day=day, **{name: 0 for name in cls.COUNTERS})
+            stats.apply(changes)
+            stats.best_visit = max(visit_score or 0, 0)
+            stats.best_finish = finish or 0
+            db.session.add(stats)
+
+    def refresh_bests(self):
+        """Recompute the best visit and finish from the day's turns, after an undo lowered one"""
+        from app.models.leg import Leg
+        from app.models.match import Match
+        from app.models.turn import Turn
+
+        start = datetime.combine(self.day, datetime.min.time())
+        turn_start = Turn.remaining_score + Turn.score
+        visit_over = (Turn.darts_thrown >= x01.DARTS_PER_TURN) | (Turn.is_bust == True) | (Turn.is_checkout == True)
+        best_visit, best_finish = db.session.query(
+            db.func.max(db.case((visit_over, Turn.score), else_=0)),
+            db.func.max(db.case((Turn.is_checkout == True, turn_start), else_=0))
+        ).join(Leg, Turn.leg_id == Leg.id).join(Match, Leg.match_id == Match.id).filter(
+            Turn.player_id == self.player_id,
+            Match.game_type.in_(tuple(x01.VARIANTS)),
+            Turn.created_at >= start,
+            Turn.created_at < start + timedelta(days=1)
+        ).one()
+        self.best_visit = best_visit or 0
+        self.best_finish = best_finish or 0
+
+    @classmethod
+    def get_or_create(cls, player_id, day, lock=False):
+        """Get a player's row for a day, locked (SELECT ... FOR UPDATE) with lock=True"""
+        stats = db.session.get(cls, (player_id, day), with_for_update=True if lock else None)
+        if stats is None:
+            stats = cls(player_id=player_id, day=day, **{name: 0 for name in cls.COUNTERS + cls.BESTS})
+            db.session.add(stats)
+        return stats
+
+    @classmethod
+    def totals(cls, session, player_id, since_day):
+        """Counters summed, and bests maximised, over the player's rows from since_day on"""
+        row = session.query(
+            *[db.func.sum(getattr(cls, name)) for name in cls.COUNTERS],
+            *[db.func.max(getattr(cls, name)) for name in cls.BESTS]
+        ).filter(
+            cls.player_id == player_id,
+            cls.day >= since_day
+        ).one()
+        return {name: int(value or 0) for name, value in zip(cls.COUNTERS + cls.BESTS, row)}
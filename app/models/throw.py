@@ -6,6 +6,9 @@ from app import db
 class Throw(db.Model):
     """Throw model for darts scoring system"""
     __tablename__ = 'throws'
+    __table_args__ = (
+        db.Index('uq_throws_turn_dart', 'turn_id', 'dart_number', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     turn_id = db.Column(db.Integer, db.ForeignKey('turns.id'), nullable=False)
@@ -15,6 +18,7 @@ class Throw(db.Model):
     points = db.Column(db.Integer, nullable=False)
     is_bust = db.Column(db.Boolean, default=False)
     is_checkout = db.Column(db.Boolean, default=False)
+    marks = db.Column(db.Integer)  # Cricket marks added by this dart, so undo needs no replay
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -1,11 +1,17 @@
 """Turn model"""
 from datetime import datetime
 from app import db
+from app.utils.serialization import select_fields
 
 
 class Turn(db.Model):
     """Turn model for darts scoring system"""
     __tablename__ = 'turns'
+    __table_args__ = (
+        db.Index('ix_turns_leg_turn_number', 'leg_id', 'turn_number', unique=True),
+        db.Index('ix_turns_leg_player_bust', 'leg_id', 'player_id', 'is_bust'),
+        db.Index('ix_turns_player_leg', 'player_id', 'leg_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     leg_id = db.Column(db.Integer, db.ForeignKey('legs.id'), nullable=False)
@@ -16,6 +22,7 @@ class Turn(db.Model):
     darts_thrown = db.Column(db.Integer, default=0)
     is_bust = db.Column(db.Boolean, default=False)
     is_checkout = db.Column(db.Boolean, default=False)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Leg version of the last change
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -38,9 +45,9 @@ class Turn(db.Model):
     def __repr__(self):
         return f'<Turn {self.turn_number} by Player {self.player_id}>'
     
-    def to_dict(self):
-        """Convert turn to dictionary"""
-        return {
+    def to_dict(self, include=('throws',), fields=None):
+        """Convert turn to dictionary, nesting throws if included"""
+        data = {
             'id': self.id,
             'leg_id': self.leg_id,
             'player_id': self.player_id,
@@ -50,9 +57,11 @@ class Turn(db.Model):
             'darts_thrown': self.darts_thrown,
             'is_bust': self.is_bust,
             'is_checkout': self.is_checkout,
-            'throws': [throw.to_dict() for throw in self.throws],
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if 'throws' in include:
+            data['throws'] = [select_fields(throw.to_dict(), fields, 'throws') for throw in self.throws]
+        return select_fields(data, fields, 'turns')
     
     @classmethod
     def create_for_leg(cls, leg_id, player_id, turn_number, remaining_score):
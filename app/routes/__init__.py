@@ -5,13 +5,17 @@ from flask import Blueprint
 api_bp = Blueprint('api', __name__)
 
 # Import all route modules
-from app.routes import players, matches, stats
+from app.routes import players, matches, stats, metrics, health
 
 # Register blueprints
 from app.routes.players import players_bp
 from app.routes.matches import matches_bp
 from app.routes.stats import stats_bp
+from app.routes.metrics import metrics_bp
+from app.routes.health import health_bp
 
 api_bp.register_blueprint(players_bp, url_prefix='/players')
 api_bp.register_blueprint(matches_bp, url_prefix='/matches')
-api_bp.register_blueprint(stats_bp, url_prefix='/stats')
\ No newline at end of file
+api_bp.register_blueprint(stats_bp, url_prefix='/stats')
+api_bp.register_blueprint(metrics_bp, url_prefix='/metrics')
+api_bp.register_blueprint(health_bp, url_prefix='/health')
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""Health routes"""
+import time
+
+from flask import Blueprint, current_app, jsonify
+
+from app import db
+from app.services.game_cache import game_cache
+from app.utils.health import database_probe, pool_stats
+from app.utils.stats_db import stats_engine
+
+health_bp = Blueprint('health', __name__)
+
+_started = time.monotonic()
+
+
+@health_bp.route('/live', methods=['GET', 'HEAD'])
+def liveness():
+    """The process is up and serving requests (never touches the database)"""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/ready', methods=['GET', 'HEAD'])
+def readiness():
+    """The database answered its (cached) ping, so throws can be recorded"""
+    database = database_probe().check()
+    return jsonify({'status': 'ok' if database['ok'] else 'unavailable', 'database': database}), \
+        200 if database['ok'] else 503
+
+
+@health_bp.route('', methods=['GET', 'HEAD'])
+def health():
+    """Liveness, readiness, connection pool usage and game cache hit rates in one response"""
+    database = database_probe().check()
+
+    pools = {'main': pool_stats(db.engine)}
+    engine = stats_engine()
+    if engine is not None:
+        pools['stats'] = pool_stats(engine)
+
+    return jsonify({
+        'status': 'ok' if database['ok'] else 'unavailable',
+        'live': True,
+        'ready': database['ok'],
+        'database': database,
+        'pools': pools,
+        'game_cache': game_cache().stats(),
+        'uptime_seconds': round(time.monotonic() - _started, 1),
+        'startup_ms': current_app.extensions.get('startup_timings', {}).get('total')
+    }), 200 if database['ok'] else 503
@@ -1,24 +1,189 @@
 """Match routes"""
-from flask import Blueprint, request, jsonify
+import logging
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
 from app import db
-from app.models import Match, Leg, Player
-from app.services.scoring_engine import ScoringEngine
+from app.models import Match, PlayerMatch, Leg, Player
+from app.models.match import FULL_DEPTH, GAME_TYPES
+from app.services.game_cache import game_cache
+from app.services.scoring_engine import LegConflict, ScoringEngine
+from app.services.live_events import broker, leg_channel, match_channel
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.serialization import parse_include, parse_fields
+
+logger = logging.getLogger(__name__)
 
 matches_bp = Blueprint('matches', __name__)
 
 
+MATCH_STATUSES = ['active', 'completed', 'abandoned', 'all']
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _parse_datetime_arg(name):
+    """Parse an ISO date/datetime query argument, raising ValueError if malformed"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime, got {value}')
+
+
+def _conflict_response(error):
+    """409 for a write that lost a race on the leg; the client should resend it"""
+    return jsonify({'error': str(error), 'retryable': True}), 409, {'Retry-After': '1'}
+
+
+def _engine_for_leg(leg):
+    """Scoring engine for the game type of the leg's match"""
+    return ScoringEngine.for_game_type(game_cache().match_info(leg.match_id).game_type)
+
+
+def _match_summaries(rows):
+    """Compact summary dicts for projected match rows, loading players in one query"""
+    match_ids = [row.id for row in rows]
+    players_by_match = {match_id: [] for match_id in match_ids}
+    
+    if match_ids:
+        legs_won = db.func.count(Leg.id)
+        player_rows = db.session.query(
+            PlayerMatch.match_id,
+            PlayerMatch.player_id,
+            Player.name,
+            Player.nickname,
+            legs_won
+        ).join(
+            Player, Player.id == PlayerMatch.player_id
+        ).outerjoin(
+            Leg, db.and_(
+                Leg.match_id == PlayerMatch.match_id,
+                Leg.winning_player_id == PlayerMatch.player_id
+            )
+        ).filter(
+            PlayerMatch.match_id.in_(match_ids)
+        ).group_by(
+            PlayerMatch.match_id,
+            PlayerMatch.player_id,
+            PlayerMatch.player_order,
+            Player.name,
+            Player.nickname
+        ).order_by(PlayerMatch.match_id, PlayerMatch.player_order).all()
+        
+        for match_id, player_id, name, nickname, won in player_rows:
+            players_by_match[match_id].append({
+                'id': player_id,
+                'name': name,
+                'nickname': nickname,
+                'legs_won': won
+            })
+    
+    summaries = []
+    for row in rows:
+        players = players_by_match[row.id]
+        
+        # Winner is the player with the most legs once the match is over
+        winner_id = None
+        if row.status == 'completed' and players:
+            best = max(player['legs_won'] for player in players)
+            leaders = [player['id'] for player in players if player['legs_won'] == best]
+            if best > 0 and len(leaders) == 1:
+                winner_id = leaders[0]
+        
+        duration = None
+        if row.start_time and row.end_time:
+            duration = int((row.end_time - row.start_time).total_seconds())
+        
+        summaries.append({
+            'id': row.id,
+            'game_type': row.game_type,
+            'status': row.status,
+            'start_time': row.start_time.isoformat() if row.start_time else None,
+            'end_time': row.end_time.isoformat() if row.end_time else None,
+            'duration_seconds': duration,
+            'players': players,
+            'winner_id': winner_id
+        })
+    
+    return summaries
+
+
 @matches_bp.route('/', methods=['GET'])
 def get_matches():
-    """Get all matches"""
+    """Get a page of matches, newest first
+    
+    Filters: status, player_id, since, until. Pages are keyed on
+    (start_time, id); pass next_cursor back as ?cursor= for the next page.
+    ?view=summary returns compact rows built from a projection query.
+    """
     status = request.args.get('status', 'active')
+    player_id = request.args.get('player_id', type=int)
+    limit = request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE)
+    view = request.args.get('view', 'full')
+    
+    if status not in MATCH_STATUSES:
+        return jsonify({'error': f'status must be one of {", ".join(MATCH_STATUSES)}'}), 400
+    
+    if view not in ['full', 'summary']:
+        return jsonify({'error': 'view must be full or summary'}), 400
     
-    if status == 'active':
-        matches = Match.get_active_matches()
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    
+    try:
+        include = parse_include(request.args.get('include'), default=('players',))
+        since = _parse_datetime_arg('since')
+        until = _parse_datetime_arg('until')
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = parse_fields(request.args.get('fields'))
+    
+    if view == 'summary':
+        query = db.session.query(
+            Match.id,
+            Match.game_type,
+            Match.status,
+            Match.start_time,
+            Match.end_time
+        )
     else:
-        matches = Match.query.all()
+        query = Match.query.options(*Match.loader_options(include))
+    
+    if status != 'all':
+        query = query.filter(Match.status == status)
+    if player_id is not None:
+        query = query.filter(Match.id.in_(
+            db.select(PlayerMatch.match_id).where(PlayerMatch.player_id == player_id)
+        ))
+    if since:
+        query = query.filter(Match.start_time >= since)
+    if until:
+        query = query.filter(Match.start_time < until)
+    if after:
+        after_start_time, after_id = after
+        query = query.filter(db.or_(
+            Match.start_time < after_start_time,
+            db.and_(Match.start_time == after_start_time, Match.id < after_id)
+        ))
+    
+    # Fetch one extra row to know whether there is another page
+    rows = query.order_by(Match.start_time.desc(), Match.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id) if has_more else None
+    
+    if view == 'summary':
+        matches = _match_summaries(rows)
+    else:
+        matches = [match.to_dict(include, fields) for match in rows]
     
     return jsonify({
-        'matches': [match.to_dict() for match in matches]
+        'matches': matches,
+        'next_cursor': next_cursor
     })
 
 
@@ -43,18 +208,14 @@ def create_match():
             return jsonify({'error': f'Player {player_id} not found'}), 404
     
     # Validate game type
-    if game_type not in ['501', 'cricket']:
-        return jsonify({'error': 'Invalid game type. Must be 501 or cricket'}), 400
+    if game_type not in GAME_TYPES:
+        return jsonify({'error': f'Invalid game type. Must be one of {", ".join(GAME_TYPES)}'}), 400
     
     try:
-        if game_type == '501':
-            match = Match.create_501_match(player_ids)
-        else:
-            # For now, only 501 is implemented
-            return jsonify({'error': 'Cricket not yet implemented'}), 501
+        match = Match.create_match(player_ids, game_type)
         
         # Start first leg with first player
-        leg_result = ScoringEngine.start_new_leg(match.id, player_ids[0])
+        leg_result = ScoringEngine.for_game_type(game_type).start_new_leg(match.id, player_ids[0])
         
         return jsonify({
             'message': 'Match created successfully',
@@ -64,20 +225,23 @@ def create_match():
         
     except Exception as e:
         db.session.rollback()
-        # Log the full error for debugging
-        print(f"Error creating match: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creating match")
         return jsonify({'error': f'Failed to create match: {str(e)}'}), 500
 
 @matches_bp.route('/<int:match_id>', methods=['GET'])
 def get_match(match_id):
-    """Get a specific match"""
-    match = Match.get_by_id(match_id)
+    """Get a specific match (fully nested unless ?include= narrows it)"""
+    try:
+        include = parse_include(request.args.get('include'), default=FULL_DEPTH)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = parse_fields(request.args.get('fields'))
+    
+    match = Match.query.options(*Match.loader_options(include)).filter_by(id=match_id).first()
     if not match:
         return jsonify({'error': 'Match not found'}), 404
     
-    return jsonify({'match': match.to_dict()})
+    return jsonify({'match': match.to_dict(include, fields)})
 
 
 @matches_bp.route('/<int:match_id>/legs', methods=['GET'])
@@ -96,11 +260,23 @@ def get_match_legs(match_id):
 
 @matches_bp.route('/<int:match_id>/legs/current', methods=['GET'])
 def get_current_leg(match_id):
-    """Get current active leg for a match"""
-    match = Match.get_by_id(match_id)
+    """Get current active leg for a match
+    
+    The ETag names the leg and its state version, so a client that already
+    has this version gets 304 without the state being rebuilt. With
+    ?leg_id=L&since_version=N only the turns changed after version N are
+    returned; versions are per leg, so when L is not the current leg (or is
+    missing) the full state is returned.
+    """
+    match = game_cache().match_info(match_id)
     if not match:
         return jsonify({'error': 'Match not found'}), 404
     
+    since_version = request.args.get('since_version', type=int)
+    if since_version is not None and since_version < 0:
+        return jsonify({'error': 'since_version must be non-negative'}), 400
+    since_leg_id = request.args.get('leg_id', type=int)
+    
     active_legs = Leg.get_active_legs_for_match(match_id)
     
     if not active_legs:
@@ -108,11 +284,27 @@ def get_current_leg(match_id):
     
     # Get the most recent active leg
     current_leg = active_legs[-1]
+    if since_leg_id != current_leg.id:
+        # A version of another leg says nothing about this one
+        since_version = None
+    
+    etag = None
+    if current_leg.state is not None:
+        etag = f'leg-{current_leg.id}-v{current_leg.state.version}'
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
     
     # Get game state
-    game_state = ScoringEngine.get_current_game_state(current_leg.id)
-    
-    return jsonify(game_state)
+    game_state = ScoringEngine.for_game_type(match.game_type).get_current_game_state(current_leg.id, since_version)
+    
+    response = jsonify(game_state)
+    if etag:
+        response.set_etag(etag)
+        # Cache, but check the version on every use
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @matches_bp.route('/<int:match_id>/legs/<int:leg_id>/throw', methods=['POST'])
@@ -120,17 +312,12 @@ def record_throw(match_id, leg_id):
     """Record a dart throw"""
     data = request.get_json()
     
-    print(f"=== THROW REQUEST ===")
-    print(f"Match: {match_id}, Leg: {leg_id}")
-    print(f"Data: {data}")
-    
     # Validate required fields
     required_fields = ['player_id', 'segment', 'multiplier', 'dart_number']
     missing_fields = [field for field in required_fields if field not in data]
     
     if missing_fields:
         error_msg = f'Missing required fields: {", ".join(missing_fields)}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     player_id = data['player_id']
@@ -141,71 +328,190 @@ def record_throw(match_id, leg_id):
     # Validate dart_number specifically
     if not isinstance(dart_number, int):
         error_msg = f'Dart number must be an integer, got {type(dart_number)}: {dart_number}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     # Validate values
     if segment not in list(range(0, 21)) + [25]:
         error_msg = f'Segment must be 0-20 or 25, got {segment}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     if multiplier not in [0, 1, 2, 3]:
         error_msg = f'Multiplier must be 0-3, got {multiplier}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     if dart_number not in [1, 2, 3]:
         error_msg = f'Dart number must be 1-3, got {dart_number}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     # Verify leg exists and belongs to match
     leg = Leg.get_by_id(leg_id)
     if not leg:
         error_msg = f'Leg {leg_id} not found'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 404
     
     if leg.match_id != match_id:
         error_msg = f'Leg {leg_id} does not belong to match {match_id}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
-    # Verify player is in the match
-    match = Match.get_by_id(match_id)
+    # Verify player is in the match (membership and throwing order are cached)
+    match = game_cache().match_info(match_id)
     if not match:
         error_msg = f'Match {match_id} not found'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 404
     
-    player_in_match = any(pm.player_id == player_id for pm in match.player_matches)
+    player_in_match = player_id in match.player_ids
     if not player_in_match:
         error_msg = f'Player {player_id} is not in match {match_id}'
-        print(f"ERROR: {error_msg}")
         return jsonify({'error': error_msg}), 400
     
     try:
-        print(f"Calling ScoringEngine.process_throw...")
-        result = ScoringEngine.process_throw(
+        result = ScoringEngine.for_game_type(match.game_type).process_throw(
             leg_id=leg_id,
             player_id=player_id,
             segment=segment,
             multiplier=multiplier,
             dart_number=dart_number
         )
-        
-        print(f"Throw processed successfully")
         return jsonify(result)
         
+    except LegConflict as e:
+        return _conflict_response(e)
+        
     except Exception as e:
-        print(f"ERROR in process_throw: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing throw for leg %s", leg_id)
         db.session.rollback()
         return jsonify({'error': f'Failed to process throw: {str(e)}'}), 500
 
 
+@matches_bp.route('/<int:match_id>/legs/<int:leg_id>/visit', methods=['POST'])
+def record_visit(match_id, leg_id):
+    """Record up to three darts for one player in a single request"""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    missing_fields = [field for field in ['player_id', 'darts'] if field not in data]
+    if missing_fields:
+        return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
+    
+    player_id = data['player_id']
+    darts = data['darts']
+    
+    if not isinstance(darts, list) or not 1 <= len(darts) <= 3:
+        return jsonify({'error': 'darts must be a list of 1-3 darts'}), 400
+    
+    if not all(isinstance(dart, dict) and 'segment' in dart and 'multiplier' in dart for dart in darts):
+        return jsonify({'error': 'Each dart needs a segment and multiplier'}), 400
+    
+    # Verify leg belongs to match and player is in it without loading the match
+    leg = Leg.get_by_id(leg_id)
+    if not leg:
+        return jsonify({'error': f'Leg {leg_id} not found'}), 404
+    
+    if leg.match_id != match_id:
+        return jsonify({'error': f'Leg {leg_id} does not belong to match {match_id}'}), 400
+    
+    if leg.status != 'active':
+        return jsonify({'error': f'Leg {leg_id} is already completed'}), 400
+    
+    match = game_cache().match_info(match_id)
+    if player_id not in match.player_ids:
+        return jsonify({'error': f'Player {player_id} is not in match {match_id}'}), 400
+    
+    try:
+        result = ScoringEngine.for_game_type(match.game_type).process_visit(
+            leg_id=leg_id,
+            player_id=player_id,
+            darts=[(dart['segment'], dart['multiplier']) for dart in darts],
+            observed=data.get('observed')
+        )
+        return jsonify(result)
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    except LegConflict as e:
+        return _conflict_response(e)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to process visit: {str(e)}'}), 500
+
+
+@matches_bp.route('/<int:match_id>/legs/<int:leg_id>/undo', methods=['POST'])
+def undo_throw(match_id, leg_id):
+    """Undo the last dart thrown in a leg"""
+    leg = Leg.get_by_id(leg_id)
+    if not leg or leg.match_id != match_id:
+        return jsonify({'error': 'Leg not found or does not belong to match'}), 404
+    
+    try:
+        result = _engine_for_leg(leg).undo_last_throw(leg_id)
+    except LegConflict as e:
+        return _conflict_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to undo throw: {str(e)}'}), 500
+    
+    if result is None:
+        return jsonify({'error': 'No throws to undo'}), 404
+    
+    return jsonify(result)
+
+
+@matches_bp.route('/<int:match_id>/legs/<int:leg_id>/forecast', methods=['GET'])
+def forecast_leg(match_id, leg_id):
+    """Monte Carlo win probabilities from the leg's current state (?simulations=&seed=)"""
+    leg = Leg.get_by_id(leg_id)
+    if not leg or leg.match_id != match_id:
+        return jsonify({'error': 'Leg not found or does not belong to match'}), 404
+    
+    # NumPy is only loaded once someone asks for a forecast
+    from app.services import simulator
+    
+    simulations = request.args.get('simulations', simulator.DEFAULT_SIMULATIONS, type=int)
+    seed = request.args.get('seed', type=int)
+    
+    try:
+        return jsonify(simulator.forecast_leg(leg_id, simulations, seed))
+    except simulator.SimulatorUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+def _event_stream(channel):
+    """Stream a live event channel as text/event-stream"""
+    # Give the pooled connection back before the long-lived stream starts
+    db.session.close()
+    return Response(
+        broker.stream(channel),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@matches_bp.route('/<int:match_id>/events', methods=['GET'])
+def match_events(match_id):
+    """Live throw/undo deltas for every leg of a match (Server-Sent Events)"""
+    if not Match.get_by_id(match_id):
+        return jsonify({'error': 'Match not found'}), 404
+    
+    return _event_stream(match_channel(match_id))
+
+
+@matches_bp.route('/<int:match_id>/legs/<int:leg_id>/events', methods=['GET'])
+def leg_events(match_id, leg_id):
+    """Live throw/undo deltas for one leg (Server-Sent Events)"""
+    leg = Leg.get_by_id(leg_id)
+    if not leg or leg.match_id != match_id:
+        return jsonify({'error': 'Leg not found or does not belong to match'}), 404
+    
+    return _event_stream(leg_channel(leg_id))
+
+
 @matches_bp.route('/<int:match_id>/legs/<int:leg_id>/next-player', methods=['POST'])
 def next_player(match_id, leg_id):
     """Force move to next player (for busts or manual advancement)"""
@@ -215,12 +521,10 @@ def next_player(match_id, leg_id):
         return jsonify({'error': 'Leg not found or does not belong to match'}), 404
     
     # Get current game state
-    game_state = ScoringEngine.get_current_game_state(leg_id)
+    game_state = _engine_for_leg(leg).get_current_game_state(leg_id)
     
     # Get players in match
-    match = Match.get_by_id(match_id)
-    player_matches = match.player_matches
-    player_ids = [pm.player_id for pm in sorted(player_matches, key=lambda x: x.player_order)]
+    player_ids = list(game_cache().match_info(match_id).player_ids)
     
     # Determine current player
     current_player_id = game_state['current_player_id']
@@ -0,0 +1,21 @@
+"""Metrics routes"""
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from app.utils.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    """Request latency, DB time and query count histograms (Prometheus text format)
+    
+    Behind a reverse proxy every request comes from the proxy's address, so
+    set PROXY_COUNT (config.py) or the loopback check lets everyone in.
+    """
+    if current_app.config.get('METRICS_LOCAL_ONLY', True) and request.remote_addr not in LOCAL_ADDRESSES:
+        return jsonify({'error': 'Metrics are only served to local clients'}), 403
+    
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,30 +1,61 @@
 """Statistics routes"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import OperationalError
 from app import db
-from app.models import Player, Match, Leg, Turn, Throw
+from app.models import Player, Match, PlayerMatch, Leg, Turn, Throw, PlayerDayStats
+from app.models.player_day_stats import OPENING_VISITS
+from app.services import x01
+from app.services.checkout_table import checkout_table, MAX_CHECKOUT
+from app.utils.stats_db import is_statement_timeout, stats_session
 from datetime import datetime, timedelta
 
 stats_bp = Blueprint('stats', __name__)
 
+# Opening visits covered by the first-N averages (first_3 ... first_12)
+FIRST_N_MAX_VISITS = OPENING_VISITS
+
+# Averages, doubles and finishes only mean something for X01 legs
+X01_GAME_TYPES = tuple(x01.VARIANTS)
+
+
+@stats_bp.errorhandler(OperationalError)
+def _statistics_unavailable(error):
+    """Statistics that hit the statement timeout are reported as unavailable, not failed"""
+    stats_session().rollback()
+    if is_statement_timeout(error):
+        return jsonify({'error': 'Statistics query took too long, try a shorter period'}), 503
+    raise error
+
+
+def _first_visit_averages(totals, max_visits=FIRST_N_MAX_VISITS):
+    """3-dart averages over each leg's first 1..max_visits visits, from summed rollup totals"""
+    averages = {}
+    points_so_far = darts_so_far = 0
+    for visit in range(1, max_visits + 1):
+        points_so_far += totals[f'visit{visit}_points']
+        darts_so_far += totals[f'visit{visit}_darts']
+        averages[f'first_{visit * 3}'] = round(points_so_far / darts_so_far * 3, 2) if darts_so_far else 0
+    
+    return averages
+
 
 @stats_bp.route('/player/<int:player_id>', methods=['GET'])
 def get_player_stats(player_id):
-    """Get statistics for a specific player"""
-    player = Player.get_by_id(player_id)
+    """Get statistics for a specific player from the per-day rollup"""
+    session = stats_session()
+    player = session.get(Player, player_id)
     if not player:
         return jsonify({'error': 'Player not found'}), 404
     
-    # Get time range from query parameters
+    # Get time range from query parameters: today and the days before it
     days = request.args.get('days', type=int, default=30)
-    since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Get all throws for this player within time range
-    throws_query = db.session.query(Throw).join(Turn).join(Leg).join(Match).filter(
-        Turn.player_id == player_id,
-        Match.start_time >= since_date
-    )
+    if days < 1:
+        return jsonify({'error': 'days must be at least 1'}), 400
+    since_day = (datetime.utcnow() - timedelta(days=days - 1)).date()
     
-    total_throws = throws_query.count()
+    # At most one rollup row per day, whatever the history size
+    totals = PlayerDayStats.totals(session, player_id, since_day)
+    total_throws = totals['darts']
     
     if total_throws == 0:
         return jsonify({
@@ -36,91 +67,31 @@ def get_player_stats(player_id):
                 'double_hit_percentage': 0,
                 'highest_finish': 0,
                 'highest_scoring_visit': 0,
-                'first_9_average': 0
+                'first_9_average': 0,
+                'first_n_averages': {f'first_{visits * 3}': 0 for visits in range(1, FIRST_N_MAX_VISITS + 1)}
             },
             'message': 'No throws recorded in the specified period'
         })
     
-    # Calculate total points
-    total_points = db.session.query(db.func.sum(Throw.points)).join(Turn).filter(
-        Turn.player_id == player_id,
-        Throw.is_bust == False
-    ).scalar() or 0
-    
-    # Calculate 3-dart average
-    three_dart_average = round((total_points / total_throws) * 3, 2)
-    
-    # Calculate checkout statistics
-    checkout_attempts = throws_query.filter(
-        Throw.multiplier == 2,  # Double attempts
-        Throw.segment.between(1, 20)  # Not bull
-    ).count() + throws_query.filter(
-        Throw.segment == 25,
-        Throw.multiplier == 2  # Double bull attempts
-    ).count()
-    
-    checkout_success = throws_query.filter(
-        Throw.is_checkout == True
-    ).count()
+    # Calculate 3-dart average (bust visits score 0)
+    three_dart_average = round((totals['points'] / total_throws) * 3, 2)
     
+    # Checkouts per dart that landed in a double (bull included)
+    checkout_attempts = totals['doubles_hit']
+    checkout_success = totals['checkouts']
     checkout_percentage = round((checkout_success / checkout_attempts * 100), 2) if checkout_attempts > 0 else 0
     
     # Calculate double hit percentage
-    double_attempts = throws_query.filter(Throw.multiplier == 2).count()
-    double_hits = throws_query.filter(
-        Throw.multiplier == 2,
-        Throw.segment > 0  # Not a miss
-    ).count()
-    
+    double_attempts = totals['doubles_attempted']
+    double_hits = totals['doubles_hit']
     double_hit_percentage = round((double_hits / double_attempts * 100), 2) if double_attempts > 0 else 0
     
-    # Get highest finish
-    highest_finish_query = db.session.query(
-        Turn.remaining_score + Turn.score
-    ).join(Leg).join(Match).filter(
-        Turn.player_id == player_id,
-        Turn.is_checkout == True,
-        Match.start_time >= since_date
-    ).order_by(
-        (Turn.remaining_score + Turn.score).desc()
-    ).first()
-    
-    highest_finish = highest_finish_query[0] if highest_finish_query else 0
-    
-    # Get highest scoring visit (3-dart turn)
-    highest_scoring_visit_query = db.session.query(
-        db.func.sum(Throw.points)
-    ).join(Turn).filter(
-        Turn.player_id == player_id,
-        Match.start_time >= since_date
-    ).group_by(
-        Turn.id
-    ).order_by(
-        db.func.sum(Throw.points).desc()
-    ).first()
+    highest_finish = totals['best_finish']
+    highest_scoring_visit = totals['best_visit']
     
-    highest_scoring_visit = highest_scoring_visit_query[0] if highest_scoring_visit_query else 0
-    
-    # Calculate first 9 average (first 9 darts of a leg)
-    # This is more complex - we need to get the first 3 turns for each leg
-    first_9_scores = []
-    legs = Leg.query.join(Match).filter(
-        Match.start_time >= since_date
-    ).all()
-    
-    for leg in legs:
-        # Get first 3 turns for this player in this leg
-        first_turns = Turn.query.filter(
-            Turn.leg_id == leg.id,
-            Turn.player_id == player_id
-        ).order_by(Turn.turn_number).limit(3).all()
-        
-        if len(first_turns) >= 3:
-            # Calculate total score for first 9 darts
-            first_9_total = sum(turn.score for turn in first_turns)
-            first_9_scores.append(first_9_total)
-    
-    first_9_average = round(sum(first_9_scores) / len(first_9_scores), 2) if first_9_scores else 0
+    # First-N averages (3-dart average over each leg's opening visits)
+    first_n_averages = _first_visit_averages(totals)
+    first_9_average = first_n_averages['first_9']
     
     return jsonify({
         'player': player.to_dict(),
@@ -132,6 +103,7 @@ def get_player_stats(player_id):
             'highest_finish': highest_finish,
             'highest_scoring_visit': highest_scoring_visit,
             'first_9_average': first_9_average,
+            'first_n_averages': first_n_averages,
             'time_period_days': days
         }
     })
@@ -140,12 +112,13 @@ def get_player_stats(player_id):
 @stats_bp.route('/match/<int:match_id>', methods=['GET'])
 def get_match_stats(match_id):
     """Get statistics for a specific match"""
-    match = Match.get_by_id(match_id)
+    session = stats_session()
+    match = session.get(Match, match_id)
     if not match:
         return jsonify({'error': 'Match not found'}), 404
     
     # Get all legs for this match
-    legs = Leg.query.filter_by(match_id=match_id).all()
+    legs = session.query(Leg).filter_by(match_id=match_id).all()
     
     # Get player statistics for this match
     player_stats = {}
@@ -154,7 +127,7 @@ def get_match_stats(match_id):
         player_id = player.id
         
         # Get all throws for this player in this match
-        throws = db.session.query(Throw).join(Turn).join(Leg).filter(
+        throws = session.query(Throw).join(Turn).join(Leg).filter(
             Leg.match_id == match_id,
             Turn.player_id == player_id
         ).all()
@@ -187,6 +160,9 @@ def get_match_stats(match_id):
     })
 
 
+LEADERBOARD_SORTS = ['three_dart_average', 'legs_won', 'matches_played', 'total_throws']
+
+
 @stats_bp.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
     """Get leaderboard for all players"""
@@ -194,51 +170,114 @@ def get_leaderboard():
     days = request.args.get('days', type=int, default=30)
     since_date = datetime.utcnow() - timedelta(days=days)
     
-    # Get all active players
-    players = Player.get_all_active()
+    sort = request.args.get('sort', 'three_dart_average')
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', type=int, default=0)
     
-    leaderboard = []
+    if sort not in LEADERBOARD_SORTS:
+        return jsonify({'error': f'sort must be one of {", ".join(LEADERBOARD_SORTS)}'}), 400
     
-    for player in players:
-        # Get throws for this player within time range
-        throws_query = db.session.query(Throw).join(Turn).join(Leg).join(Match).filter(
-            Turn.player_id == player.id,
-            Match.start_time >= since_date
-        )
-        
-        total_throws = throws_query.count()
-        
-        if total_throws == 0:
-            continue
-        
-        # Calculate total points
-        total_points = db.session.query(db.func.sum(Throw.points)).join(Turn).filter(
-            Turn.player_id == player.id,
-            Throw.is_bust == False,
-            Match.start_time >= since_date
-        ).scalar() or 0
-        
-        # Calculate 3-dart average
-        three_dart_average = round((total_points / total_throws) * 3, 2)
-        
-        # Count legs won
-        legs_won = Leg.query.join(Match).filter(
-            Leg.winning_player_id == player.id,
-            Match.start_time >= since_date
-        ).count()
-        
-        leaderboard.append({
-            'player': player.to_dict(),
-            'three_dart_average': three_dart_average,
-            'total_throws': total_throws,
-            'legs_won': legs_won,
-            'matches_played': len(player.matches)
-        })
+    if (limit is not None and limit < 1) or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset non-negative'}), 400
+    
+    # Darts and points per player (bust visits score 0)
+    session = stats_session()
+    turn_stats = session.query(
+        Turn.player_id.label('player_id'),
+        db.func.sum(Turn.darts_thrown).label('total_throws'),
+        db.func.sum(Turn.score).label('total_points')
+    ).join(Leg, Turn.leg_id == Leg.id).join(Match, Leg.match_id == Match.id).filter(
+        Match.game_type.in_(X01_GAME_TYPES),
+        Match.start_time >= since_date
+    ).group_by(Turn.player_id).subquery()
+    
+    legs_won_stats = session.query(
+        Leg.winning_player_id.label('player_id'),
+        db.func.count(Leg.id).label('legs_won')
+    ).join(Match, Leg.match_id == Match.id).filter(
+        Leg.winning_player_id.isnot(None),
+        Match.start_time >= since_date
+    ).group_by(Leg.winning_player_id).subquery()
+    
+    match_stats = session.query(
+        PlayerMatch.player_id.label('player_id'),
+        db.func.count(PlayerMatch.match_id).label('matches_played')
+    ).join(Match, PlayerMatch.match_id == Match.id).filter(
+        Match.start_time >= since_date
+    ).group_by(PlayerMatch.player_id).subquery()
     
-    # Sort by 3-dart average (descending)
-    leaderboard.sort(key=lambda x: x['three_dart_average'], reverse=True)
+    three_dart_average = turn_stats.c.total_points * 3.0 / turn_stats.c.total_throws
+    legs_won = db.func.coalesce(legs_won_stats.c.legs_won, 0)
+    matches_played = db.func.coalesce(match_stats.c.matches_played, 0)
+    sort_columns = {
+        'three_dart_average': three_dart_average,
+        'legs_won': legs_won,
+        'matches_played': matches_played,
+        'total_throws': turn_stats.c.total_throws
+    }
+    
+    # One statement: players joined to their grouped totals, ranked in SQL
+    query = session.query(
+        Player,
+        turn_stats.c.total_throws,
+        three_dart_average,
+        legs_won,
+        matches_played
+    ).join(
+        turn_stats, turn_stats.c.player_id == Player.id
+    ).outerjoin(
+        legs_won_stats, legs_won_stats.c.player_id == Player.id
+    ).outerjoin(
+        match_stats, match_stats.c.player_id == Player.id
+    ).filter(
+        Player.is_active == True,
+        turn_stats.c.total_throws > 0
+    ).order_by(
+        sort_columns[sort].desc(),
+        three_dart_average.desc(),
+        Player.id
+    ).offset(offset)
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    leaderboard = [
+        {
+            'player': player.to_dict(),
+            'three_dart_average': round(float(average), 2),
+            'total_throws': int(total_throws),
+            'legs_won': int(player_legs_won),
+            'matches_played': int(player_matches_played)
+        }
+        for player, total_throws, average, player_legs_won, player_matches_played in query.all()
+    ]
     
     return jsonify({
         'leaderboard': leaderboard,
-        'time_period_days': days
+        'time_period_days': days,
+        'sort': sort,
+        'limit': limit,
+        'offset': offset
+    })
+
+
+@stats_bp.route('/checkout/<int:score>', methods=['GET'])
+def get_checkout(score):
+    """Get ranked checkout routes for a remaining score"""
+    darts = request.args.get('darts', type=int, default=3)
+    preferred_double = request.args.get('double', type=int, default=current_app.config.get('PREFERRED_DOUBLE'))
+    
+    if darts not in [1, 2, 3]:
+        return jsonify({'error': 'darts must be 1, 2 or 3'}), 400
+    
+    if not 2 <= score <= MAX_CHECKOUT:
+        return jsonify({'error': f'Score must be between 2 and {MAX_CHECKOUT}'}), 400
+    
+    routes = checkout_table.build().suggest(score, darts, preferred_double)
+    
+    return jsonify({
+        'score': score,
+        'darts_left': darts,
+        'preferred_double': preferred_double,
+        'routes': routes
     })
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""Precomputed checkout suggestions for double-out and master-out finishes"""
+import threading
+from itertools import combinations_with_replacement
+from typing import Dict, List, Optional, Tuple
+
+from app.services import x01
+from app.services.scoring_engine import ScoringEngine, DartMultiplier
+
+
+# Every scoring dart on the board as (segment, multiplier)
+BOARD_DARTS = (
+    [(segment, DartMultiplier.SINGLE.value) for segment in range(1, 21)] +
+    [(segment, DartMultiplier.DOUBLE.value) for segment in range(1, 21)] +
+    [(segment, DartMultiplier.TREBLE.value) for segment in range(1, 21)] +
+    [(25, DartMultiplier.SINGLE.value), (25, DartMultiplier.DOUBLE.value)]
+)
+
+FINISHING_DARTS = [dart for dart in BOARD_DARTS if dart[1] == DartMultiplier.DOUBLE.value]
+# Master-out also finishes on a treble
+MASTER_FINISHING_DARTS = [
+    dart for dart in BOARD_DARTS if dart[1] in (DartMultiplier.DOUBLE.value, DartMultiplier.TREBLE.value)
+]
+
+# Doubles in the order players usually prefer to leave them (most forgiving first)
+DOUBLE_PREFERENCE = [20, 16, 8, 18, 12, 10, 4, 14, 6, 2, 19, 17, 15, 13, 11, 9, 7, 5, 3, 1, 25]
+
+MAX_CHECKOUT = 170
+MAX_MASTER_CHECKOUT = 180
+ROUTES_PER_ENTRY = 5
+
+
+def dart_label(segment: int, multiplier: int) -> str:
+    """Short label for a dart, e.g. T20, D16, S5, 25 or BULL"""
+    if segment == 25:
+        return 'BULL' if multiplier == DartMultiplier.DOUBLE.value else '25'
+    return {1: 'S', 2: 'D', 3: 'T'}[multiplier] + str(segment)
+
+
+class CheckoutTable:
+    """Ranked finishing routes for every score from 2 to 170 (180 master-out) with 1-3 darts left
+
+    The table is built once and every lookup is a dictionary access keyed by
+    (preferred double, score, darts left), so suggestions never touch the
+    database. Master-out routes may finish on a treble; the preferred double
+    then ranks the finishing segment.
+    """
+
+    def __init__(self, out_rule: str = x01.DOUBLE_OUT):
+        self.out_rule = out_rule
+        if out_rule == x01.MASTER_OUT:
+            self.finishing_darts, self.max_checkout = MASTER_FINISHING_DARTS, MAX_MASTER_CHECKOUT
+        else:
+            self.finishing_darts, self.max_checkout = FINISHING_DARTS, MAX_CHECKOUT
+        self._routes: Dict[Tuple[int, int, int], List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self) -> bool:
+        return bool(self._routes)
+
+    def build(self) -> 'CheckoutTable':
+        """Enumerate and rank all routes (no-op if already built)
+
+        Safe to call from several threads: one builds while the others wait,
+        and lookups only ever see the finished table.
+        """
+        if self.is_built:
+            return self
+
+        with self._lock:
+            if not self.is_built:
+                self._routes = self._build_routes()
+        return self
+
+    def _build_routes(self) -> Dict[Tuple[int, int, int], List[Dict]]:
+        """Every route from 2 to max_checkout, ranked and trimmed to what lookups need"""
+        # score -> darts used -> routes, each route already in best-first order
+        candidates: Dict[int, Dict[int, List[Tuple]]] = {}
+        for darts_used in (1, 2, 3):
+            for setup in combinations_with_replacement(BOARD_DARTS, darts_used - 1):
+                setup = tuple(sorted(setup, key=lambda d: ScoringEngine.calculate_points(*d), reverse=True))
+                setup_points = sum(ScoringEngine.calculate_points(*dart) for dart in setup)
+                for finish in self.finishing_darts:
+                    score = setup_points + ScoringEngine.calculate_points(*finish)
+                    if score > self.max_checkout:
+                        continue
+                    route = setup + (finish,)
+                    candidates.setdefault(score, {}).setdefault(darts_used, []).append(
+                        (self._rank(route), route)
+                    )
+
+        # Keep only what a lookup can need: the top routes overall and per finishing double
+        shortlists = {}
+        for score, by_darts in candidates.items():
+            for darts_used, routes in by_darts.items():
+                routes.sort()
+                by_double: Dict[int, List[Tuple]] = {}
+                for _, route in routes:
+                    finish_routes = by_double.setdefault(route[-1][0], [])
+                    if len(finish_routes) < ROUTES_PER_ENTRY:
+                        finish_routes.append(route)
+                overall = [route for _, route in routes[:ROUTES_PER_ENTRY * 2]]
+                shortlists[(score, darts_used)] = (overall, by_double)
+
+        table = {}
+        for preferred in DOUBLE_PREFERENCE:
+            for score in range(2, self.max_checkout + 1):
+                for darts_left in (1, 2, 3):
+                    ranked = []
+                    # Fewer darts always wins; within a dart count the preferred double goes first
+                    for darts_used in range(1, darts_left + 1):
+                        if (score, darts_used) not in shortlists:
+                            continue
+                        overall, by_double = shortlists[(score, darts_used)]
+                        ranked.extend(by_double.get(preferred, []))
+                        ranked.extend([route for route in overall if route[-1][0] != preferred])
+                        if len(ranked) >= ROUTES_PER_ENTRY:
+                            break
+                    table[(preferred, score, darts_left)] = [
+                        self._route_to_dict(route) for route in ranked[:ROUTES_PER_ENTRY]
+                    ]
+
+        return table
+
+    def suggest(self, score: int, darts_left: int = 3, preferred_double: Optional[int] = None) -> List[Dict]:
+        """Ranked routes for a score, or an empty list if it cannot be finished"""
+        preferred = preferred_double if preferred_double in DOUBLE_PREFERENCE else DOUBLE_PREFERENCE[0]
+        return self._routes.get((preferred, score, darts_left), [])
+
+    def best(self, score: int, darts_left: int = 3, preferred_double: Optional[int] = None) -> Optional[Dict]:
+        """The top-ranked route for a score, or None"""
+        routes = self.suggest(score, darts_left, preferred_double)
+        return routes[0] if routes else None
+
+    @staticmethod
+    def _rank(route: Tuple) -> Tuple:
+        """Sort key within a dart count: best double, then simplest set-up darts"""
+        setup = route[:-1]
+        return (
+            DOUBLE_PREFERENCE.index(route[-1][0]),
+            sum(1 for _, multiplier in setup if multiplier != DartMultiplier.SINGLE.value),
+            sum(1 for segment, _ in setup if segment == 25),
+            -sum(ScoringEngine.calculate_points(*dart) for dart in setup)
+        )
+
+    @staticmethod
+    def _route_to_dict(route: Tuple) -> Dict:
+        return {
+            'darts': [dart_label(segment, multiplier) for segment, multiplier in route],
+            'throws': [{'segment': segment, 'multiplier': multiplier} for segment, multiplier in route],
+            'dart_count': len(route)
+        }
+
+
+checkout_table = CheckoutTable()
+master_checkout_table = CheckoutTable(x01.MASTER_OUT)
+
+
+def checkout_table_for(out_rule: str) -> CheckoutTable:
+    """The (unbuilt until first use) table for an X01 out rule"""
+    return master_checkout_table if out_rule == x01.MASTER_OUT else checkout_table
+
+
+def build_all() -> None:
+    """Build the double-out and master-out tables, for a startup thread"""
+    checkout_table.build()
+    master_checkout_table.build()
@@ -0,0 +1,90 @@
+"""In-memory cricket scoring rules
+
+A player's marks on 15-20 and the bull are packed into one integer, two
+bits per target (0-3 marks), so updating marks, points and closed targets
+for a dart is a handful of integer operations regardless of how long the
+leg has run. Like the x01 core this has no database or Flask dependency.
+"""
+from typing import Dict, Iterable, Tuple
+
+from app.services.x01 import BULL, MISS, validate_dart
+
+TARGETS = (15, 16, 17, 18, 19, 20, BULL)
+MARKS_TO_CLOSE = 3
+
+_BITS_PER_TARGET = 2
+_TARGET_SHIFT = {target: index * _BITS_PER_TARGET for index, target in enumerate(TARGETS)}
+_MARK_MASK = (1 << _BITS_PER_TARGET) - 1
+
+# The low bit of every target's field; a target is closed when both its bits are set
+_LOW_BITS = sum(1 << shift for shift in _TARGET_SHIFT.values())
+ALL_CLOSED = _LOW_BITS
+
+
+def target_marks(marks: int, target: int) -> int:
+    """Marks (0-3) a packed value holds on one target"""
+    return (marks >> _TARGET_SHIFT[target]) & _MARK_MASK
+
+
+def closed_targets(marks: int) -> int:
+    """Bitmask (one low bit per target field) of the targets with three marks"""
+    return marks & (marks >> 1) & _LOW_BITS
+
+
+def is_closed(closed: int, target: int) -> bool:
+    return bool(closed & (1 << _TARGET_SHIFT[target]))
+
+
+def unpack_marks(marks: int) -> Dict[int, int]:
+    """Marks per target as a dictionary, for display"""
+    return {target: target_marks(marks, target) for target in TARGETS}
+
+
+def dart_hits(segment: int, multiplier: int) -> int:
+    """Marks a dart is worth on its segment (0 off the cricket targets)"""
+    if segment not in _TARGET_SHIFT or multiplier == MISS:
+        return 0
+    return multiplier
+
+
+def closed_by_all(opponent_marks: Iterable[int]) -> int:
+    """Targets every opponent has closed (no points can be scored on them)"""
+    closed = ALL_CLOSED
+    for marks in opponent_marks:
+        closed &= closed_targets(marks)
+    return closed
+
+
+def score_dart(marks: int, segment: int, multiplier: int, dead: int) -> Tuple[int, int, int]:
+    """Apply a dart to a player's packed marks
+
+    dead is the closed_by_all() mask of the player's opponents. Returns
+    (new marks, marks added, points scored): marks past the third score the
+    target's value unless every opponent has closed it.
+    """
+    validate_dart(segment, multiplier)
+    hits = dart_hits(segment, multiplier)
+    if not hits:
+        return marks, 0, 0
+
+    shift = _TARGET_SHIFT[segment]
+    current = (marks >> shift) & _MARK_MASK
+    added = min(hits, MARKS_TO_CLOSE - current)
+    extra = hits - added
+
+    points = 0
+    if extra and not dead & (1 << shift):
+        points = extra * segment
+    return marks + (added << shift), added, points
+
+
+def undo_dart(marks: int, segment: int, marks_added: int) -> int:
+    """Take back the marks a dart added"""
+    if not marks_added:
+        return marks
+    return marks - (marks_added << _TARGET_SHIFT[segment])
+
+
+def has_won(marks: int, points: int, opponent_points: Iterable[int]) -> bool:
+    """All targets closed and at least level on points with every opponent"""
+    return closed_targets(marks) == ALL_CLOSED and all(points >= other for other in opponent_points)
@@ -0,0 +1,146 @@
+"""Scoring engine for cricket"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app import db
+from app.models import Leg, Turn, Throw, LegState, LegPlayerState, PlayerMatch
+from app.services import cricket
+from app.services.scoring_engine import ScoringEngine
+
+
+class CricketEngine(ScoringEngine):
+    """Scoring engine for cricket (15-20 and the bull)
+
+    Turns, throws and live events work as in ScoringEngine. Each player's
+    LegPlayerState holds their packed marks and, in remaining_score, the
+    points they have scored; each throw records the marks it added, so a
+    dart and its undo only touch the leg's player states.
+    """
+
+    STARTING_SCORE = 0
+
+    @classmethod
+    def _apply_dart(
+        cls,
+        leg_id: int,
+        player_id: int,
+        turn: Turn,
+        leg_state: LegState,
+        player_state: LegPlayerState,
+        segment: int,
+        multiplier: int,
+        dart_number: int
+    ) -> Throw:
+        """Score one dart against the player's marks without committing"""
+        opponents = cls._opponent_states(leg_id, player_id)
+
+        marks, added, points = cricket.score_dart(
+            player_state.marks, segment, multiplier,
+            cricket.closed_by_all(state.marks for state in opponents)
+        )
+        player_state.marks = marks
+        player_state.remaining_score += points
+        won = cricket.has_won(marks, player_state.remaining_score, [state.remaining_score for state in opponents])
+
+        throw = Throw(
+            turn_id=turn.id,
+            dart_number=dart_number,
+            segment=segment,
+            multiplier=multiplier,
+            points=points,
+            is_bust=False,
+            is_checkout=won,
+            marks=added
+        )
+        db.session.add(throw)
+
+        turn.score += points
+        turn.remaining_score = player_state.remaining_score
+        turn.darts_thrown += 1
+
+        if won:
+            turn.is_checkout = True
+
+            leg = db.session.get(Leg, leg_id)
+            leg.status = 'completed'
+            leg.winning_player_id = player_id
+            leg.end_time = datetime.utcnow()
+
+        player_state.darts_thrown += 1
+        if turn.darts_thrown == 1:
+            player_state.visits = (player_state.visits or 0) + 1
+        player_state.bump()
+        leg_state.bump(turn)
+
+        return throw
+
+    @classmethod
+    def _undo_dart(cls, turn: Turn, player_state: LegPlayerState) -> Optional[Throw]:
+        """Take the last throw's marks and points back off the turn and player"""
+        throw = Throw.get_last_throw_for_turn(turn.id)
+        if not throw:
+            return None
+
+        player_state.marks = cricket.undo_dart(player_state.marks, throw.segment, throw.marks or 0)
+        player_state.remaining_score -= throw.points
+
+        turn.score -= throw.points
+        turn.remaining_score = player_state.remaining_score
+        turn.darts_thrown -= 1
+        turn.is_checkout = False
+        return throw
+
+    @staticmethod
+    def _opponent_states(leg_id: int, player_id: int) -> List[LegPlayerState]:
+        """Every other player's state in the leg (all are created when the leg starts)"""
+        return LegPlayerState.query.filter(
+            LegPlayerState.leg_id == leg_id,
+            LegPlayerState.player_id != player_id
+        ).all()
+
+    @staticmethod
+    def _player_state_fields(player_state: LegPlayerState) -> Dict[str, Any]:
+        return {
+            'points': player_state.remaining_score,
+            'marks': cricket.unpack_marks(player_state.marks)
+        }
+
+    @classmethod
+    def start_new_leg(cls, match_id: int, starting_player_id: int) -> Dict[str, Any]:
+        """Start a leg with empty marks for every player, so opponents are always known"""
+        result = super().start_new_leg(match_id, starting_player_id)
+
+        leg_id = result['leg']['id']
+        for player_match in PlayerMatch.query.filter_by(match_id=match_id).all():
+            LegPlayerState.get_or_create(leg_id, player_match.player_id, cls.STARTING_SCORE)
+        db.session.commit()
+
+        return result
+
+    @classmethod
+    def _scoreboard_fields(
+        cls,
+        leg: Leg,
+        player_ids: List[int],
+        current_player_id: Optional[int],
+        current_turn: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Marks, points and closed targets for each player"""
+        states = {
+            state.player_id: state
+            for state in LegPlayerState.query.filter_by(leg_id=leg.id).all()
+        }
+
+        scoreboard = []
+        for player_id in player_ids:
+            state = states.get(player_id)
+            marks = state.marks if state else 0
+            closed = cricket.closed_targets(marks)
+            scoreboard.append({
+                'player_id': player_id,
+                'points': state.remaining_score if state else 0,
+                'marks': cricket.unpack_marks(marks),
+                'closed': [target for target in cricket.TARGETS if cricket.is_closed(closed, target)]
+            })
+
+        return {'scoreboard': scoreboard}
@@ -0,0 +1,383 @@
+"""Exact expected-darts-to-finish tables and live win probabilities
+
+For a player skill bucket (three-dart average and double rate) a dynamic
+program gives, for every score 2-501 at the start of a turn, the expected
+darts to finish and the probability of finishing on exactly the n-th turn.
+The dart model is the one the Monte Carlo simulator uses (scoring darts
+at the treble 20, set-up darts to leave 32 or 40, then doubles), with the
+x01 bust rule sending a bust turn back to its starting score.
+
+Tables are saved as .npy files and memory-mapped when first needed.
+Building one takes a fraction of a second, so requests never do it: run
+`flask build-dp-tables` at deploy (or set WARM_DP_TABLES to build missing
+ones on a background thread at startup), and live_win_probability returns
+None for a player whose table is not there yet. NumPy is optional: without
+it live_win_probability returns None and table functions raise
+SimulatorUnavailable.
+"""
+import functools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from app import db
+from app.models import PlayerDayStats
+from app.services import x01
+from app.services.simulator import (
+    FINISH_MAX, PRIOR_DOUBLE_RATE, PRIOR_FINISHING_DARTS, PRIOR_SCORE_DISTRIBUTION, PRIOR_SCORING_DARTS,
+    SETUP_ACCURACY, SimulatorUnavailable
+)
+from app.utils.stats_db import stats_session
+
+MAX_SCORE = 501
+MAX_TURNS = 60
+MODEL_VERSION = 1
+
+# Skill buckets: three-dart average and double rate grids
+AVERAGE_BUCKETS = tuple(range(15, 121, 3))
+DOUBLE_RATE_BUCKETS = tuple(round(0.05 * step, 2) for step in range(1, 16))
+
+# Where a treble-20 dart lands when it is on the board but not in the treble
+T20_MISS_SPREAD = {20: 0.7, 1: 0.12, 5: 0.12, 0: 0.06}
+T20_MISS_MEAN = sum(points * share for points, share in T20_MISS_SPREAD.items())
+
+SKILL_CACHE_SECONDS = 300
+# Days of the daily statistics rollup a player's skill bucket is taken from
+SKILL_WINDOW_DAYS = 90
+PRIOR_AVERAGE = 3 * sum(points * share for points, share in PRIOR_SCORE_DISTRIBUTION.items())
+# Buckets whose dart transitions are kept for live win probabilities (about 250 KB each)
+TRANSITION_CACHE_SIZE = 32
+
+_tables: Dict[Tuple[int, float], 'np.ndarray'] = {}
+_tables_lock = threading.Lock()
+_skill_cache: Dict[int, Tuple[float, Tuple[int, float]]] = {}
+
+
+def _nearest(buckets, value):
+    return min(buckets, key=lambda bucket: abs(bucket - value))
+
+
+def skill_bucket(three_dart_average: float, double_rate: float) -> Tuple[int, float]:
+    """The (average, double rate) bucket closest to a player's skill"""
+    return _nearest(AVERAGE_BUCKETS, three_dart_average), _nearest(DOUBLE_RATE_BUCKETS, double_rate)
+
+
+def scoring_distribution(three_dart_average: float) -> Dict[int, float]:
+    """Points distribution of a dart aimed at treble 20 for a given average
+
+    Better players convert misses into trebles; below the no-treble mean
+    the remaining darts start leaving the board.
+    """
+    mean = three_dart_average / 3
+    if mean >= T20_MISS_MEAN:
+        treble = min(1.0, (mean - T20_MISS_MEAN) / (60 - T20_MISS_MEAN))
+        on_board = 1.0
+    else:
+        treble = 0.0
+        on_board = mean / T20_MISS_MEAN
+
+    distribution = {60: treble}
+    for points, share in T20_MISS_SPREAD.items():
+        distribution[points] = distribution.get(points, 0.0) + (1 - treble) * share * on_board
+    distribution[0] += 1 - sum(distribution.values())
+    return distribution
+
+
+def _dart_transitions(three_dart_average: float, double_rate: float):
+    """Per-dart (score -> non-bust score) moves, plus bust and checkout probabilities per score
+
+    A dart reaches at most about twenty scores, so the moves are kept as
+    (from, to, probability) arrays rather than a dense score x score matrix.
+    """
+    size = MAX_SCORE + 1
+    sources, targets, probabilities = [], [], []
+    bust = np.zeros(size)
+    checkout = np.zeros(size)
+    scoring = scoring_distribution(three_dart_average)
+
+    for score in range(2, size):
+        if (score <= FINISH_MAX and score % 2 == 0) or score == 50:
+            single = 25 if score == 50 else score // 2
+            outcomes = [(score, double_rate, True), (single, (1 - double_rate) / 2, False),
+                        (0, (1 - double_rate) / 2, False)]
+        elif score <= 60:
+            target = score - 32 if 1 <= score - 32 <= 20 else score - 40 if score - 40 >= 1 else 1
+            outcomes = [(target, SETUP_ACCURACY, False)]
+            outcomes += [(points, (1 - SETUP_ACCURACY) / 20, False) for points in range(1, 21)]
+        else:
+            outcomes = [(points, probability, False) for points, probability in scoring.items()]
+
+        for points, probability, on_double in outcomes:
+            multiplier = x01.DOUBLE if on_double else x01.SINGLE
+            if x01.is_bust(score, points, multiplier):
+                bust[score] += probability
+            elif x01.is_checkout(score, points, multiplier):
+                checkout[score] += probability
+            else:
+                sources.append(score)
+                targets.append(score - points)
+                probabilities.append(probability)
+
+    moves = (np.array(sources), np.array(targets), np.array(probabilities))
+    return moves, bust, checkout
+
+
+@functools.lru_cache(maxsize=TRANSITION_CACHE_SIZE)
+def _transitions(bucket: Tuple[int, float]):
+    return _dart_transitions(*bucket)
+
+
+def _move(mass, moves):
+    """Score distribution after one more non-bust, non-checkout dart"""
+    sources, targets, probabilities = moves
+    return np.bincount(targets, weights=mass[sources] * probabilities, minlength=len(mass))
+
+
+def _play_darts(mass, darts, moves, bust, checkout):
+    """Push a score distribution through some darts of one turn
+
+    Returns (expected darts thrown, end-of-turn score distribution,
+    bust probability, checkout probability).
+    """
+    thrown = 0.0
+    busted = finished = 0.0
+    for _ in range(darts):
+        thrown += mass.sum()
+        busted += mass @ bust
+        finished += mass @ checkout
+        mass = _move(mass, moves)
+    return thrown, mass, busted, finished
+
+
+def build_table(three_dart_average: float, double_rate: float) -> 'np.ndarray':
+    """Expected darts (column 0) and P(finish on turn n) (column n) for each turn-start score"""
+    if np is None:
+        raise SimulatorUnavailable('Expected-darts tables need NumPy (pip install numpy)')
+
+    # Not cached: a bulk build would otherwise keep every bucket's transitions
+    moves, bust, checkout = _dart_transitions(three_dart_average, double_rate)
+    size = MAX_SCORE + 1
+    table = np.zeros((size, MAX_TURNS + 1))
+
+    for start in range(2, size):
+        mass = np.zeros(size)
+        mass[start] = 1.0
+        thrown, ended, busted, finished = _play_darts(mass, x01.DARTS_PER_TURN, moves, bust, checkout)
+
+        # Busting or scoring nothing puts the player back on the same score
+        repeat = busted + ended[start]
+        progressed = ended.copy()
+        progressed[start] = 0.0
+
+        table[start, 0] = (thrown + progressed @ table[:, 0]) / (1 - repeat)
+        table[start, 1] = finished
+        for turn in range(2, MAX_TURNS + 1):
+            table[start, turn] = progressed @ table[:, turn - 1] + repeat * table[start, turn - 1]
+
+    return table
+
+
+def _table_dir() -> str:
+    return current_app.config.get('DP_TABLE_DIR') or os.path.join(current_app.instance_path, 'dp_tables')
+
+
+def _table_path(bucket: Tuple[int, float]) -> str:
+    average, double_rate = bucket
+    return os.path.join(_table_dir(), f'x01_{MAX_SCORE}_a{average}_d{round(double_rate * 100)}_v{MODEL_VERSION}.npy')
+
+
+def tables_available() -> bool:
+    """Whether any table is loaded or saved, so a live lookup can succeed at all"""
+    if _tables:
+        return True
+    directory = _table_dir()
+    return os.path.isdir(directory) and any(name.endswith('.npy') for name in os.listdir(directory))
+
+
+def loaded_table(bucket: Tuple[int, float]) -> Optional['np.ndarray']:
+    """Table for a skill bucket from memory or memory-mapped from disk, never built (None if not saved yet)"""
+    table = _tables.get(bucket)
+    if table is None:
+        path = _table_path(bucket)
+        if os.path.exists(path):
+            table = _tables[bucket] = np.load(path, mmap_mode='r')
+    return table
+
+
+def get_table(bucket: Tuple[int, float]) -> 'np.ndarray':
+    """Table for a skill bucket: from memory, else memory-mapped from disk, else built and saved"""
+    table = _tables.get(bucket)
+    if table is not None:
+        return table
+
+    with _tables_lock:
+        table = _tables.get(bucket)
+        if table is not None:
+            return table
+
+        path = _table_path(bucket)
+        if not os.path.exists(path):
+            built = build_table(*bucket)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f'{path}.{os.getpid()}.tmp'
+            with open(partial, 'wb') as f:
+                np.save(f, built)
+            os.replace(partial, path)
+
+        table = np.load(path, mmap_mode='r')
+        _tables[bucket] = table
+        return table
+
+
+def _rollup_skills(player_ids: List[int]) -> Dict[int, Tuple[float, float]]:
+    """Three-dart average and double rate per player from the daily statistics rollup
+
+    One indexed read of at most SKILL_WINDOW_DAYS rows per player; the club
+    prior fills in for players with few darts.
+    """
+    since_day = (datetime.utcnow() - timedelta(days=SKILL_WINDOW_DAYS - 1)).date()
+    rows = stats_session().query(
+        PlayerDayStats.player_id,
+        db.func.sum(PlayerDayStats.darts),
+        db.func.sum(PlayerDayStats.points),
+        db.func.sum(PlayerDayStats.doubles_attempted),
+        db.func.sum(PlayerDayStats.doubles_hit)
+    ).filter(
+        PlayerDayStats.player_id.in_(player_ids),
+        PlayerDayStats.day >= since_day
+    ).group_by(PlayerDayStats.player_id).all()
+    totals = {player_id: (int(darts or 0), int(points or 0), int(attempted or 0), int(hit or 0))
+              for player_id, darts, points, attempted, hit in rows}
+
+    skills = {}
+    for player_id in player_ids:
+        darts, points, attempted, hit = totals.get(player_id, (0, 0, 0, 0))
+        skills[player_id] = (
+            (3 * points + PRIOR_AVERAGE * PRIOR_SCORING_DARTS) / (darts + PRIOR_SCORING_DARTS),
+            (hit + PRIOR_DOUBLE_RATE * PRIOR_FINISHING_DARTS) / (attempted + PRIOR_FINISHING_DARTS)
+        )
+    return skills
+
+
+def player_buckets(player_ids: List[int]) -> Dict[int, Tuple[int, float]]:
+    """Skill bucket per player from the daily statistics rollup, cached for a few minutes"""
+    now = time.monotonic()
+    buckets = {}
+    stale = []
+    for player_id in player_ids:
+        cached = _skill_cache.get(player_id)
+        if cached and cached[0] > now:
+            buckets[player_id] = cached[1]
+        else:
+            stale.append(player_id)
+
+    if stale:
+        for player_id, (average, double_rate) in _rollup_skills(stale).items():
+            bucket = skill_bucket(average, double_rate)
+            _skill_cache[player_id] = (now + SKILL_CACHE_SECONDS, bucket)
+            buckets[player_id] = bucket
+
+    return buckets
+
+
+def _turns_to_finish(table, bucket, remaining: int, darts_left: int, turn_start: int):
+    """P(finish on turn n) for n = 1..MAX_TURNS, for a player part-way through a turn"""
+    if darts_left == x01.DARTS_PER_TURN and remaining == turn_start:
+        return np.asarray(table[remaining, 1:])
+
+    moves, bust, checkout = _transitions(bucket)
+    mass = np.zeros(MAX_SCORE + 1)
+    mass[remaining] = 1.0
+    _, ended, busted, finished = _play_darts(mass, darts_left, moves, bust, checkout)
+
+    turns = np.zeros(MAX_TURNS)
+    turns[0] = finished
+    turns[1:] = ended @ table[:, 1:MAX_TURNS] + busted * table[turn_start, 1:MAX_TURNS]
+    return turns
+
+
+def win_probabilities(turn_distributions: List['np.ndarray']) -> List[float]:
+    """Chance each player finishes first, listed in throwing order from the player at the oche"""
+    # still_playing[m] is P(not finished within m turns)
+    still_playing = [np.concatenate(([1.0], 1 - np.cumsum(turns))) for turns in turn_distributions]
+
+    wins = []
+    for index, turns in enumerate(turn_distributions):
+        chance = turns.copy()
+        for other, survival in enumerate(still_playing):
+            if other < index:
+                chance *= survival[1:]    # threw turn n first and must not have finished on it
+            elif other > index:
+                chance *= survival[:-1]   # throws turn n after, so must not have finished before it
+        wins.append(float(chance.sum()))
+
+    total = sum(wins)
+    return [win / total if total else 1 / len(wins) for win in wins]
+
+
+def live_win_probability(
+    player_ids: List[int],
+    remaining: List[int],
+    darts_left: int,
+    turn_start: int
+) -> Optional[Dict[int, float]]:
+    """Win probability per player, in throwing order from the player at the oche
+
+    remaining holds each player's score; the first player has darts_left
+    darts left in a turn that started on turn_start. Returns None without
+    NumPy, for scores outside the tables, or while a player's table has not
+    been built.
+    """
+    if np is None or any(not 2 <= score <= MAX_SCORE for score in remaining):
+        return None
+    # No tables at all (nothing built yet): skip looking up the players' skills
+    if not tables_available():
+        return None
+
+    buckets = player_buckets(player_ids)
+    distributions = []
+    for index, (player_id, score) in enumerate(zip(player_ids, remaining)):
+        bucket = buckets[player_id]
+        table = loaded_table(bucket)
+        if table is None:
+            return None
+        if index == 0:
+            distributions.append(_turns_to_finish(table, bucket, score, darts_left, turn_start))
+        else:
+            distributions.append(np.asarray(table[score, 1:]))
+
+    probabilities = win_probabilities(distributions)
+    return {player_id: round(probability, 4) for player_id, probability in zip(player_ids, probabilities)}
+
+
+def expected_darts(bucket: Tuple[int, float], score: int) -> float:
+    """Expected darts to finish from a turn-start score for a skill bucket"""
+    return float(get_table(bucket)[score, 0])
+
+
+def build_all_tables() -> int:
+    """Build and save the table for every skill bucket, returning how many were built"""
+    built = 0
+    for average in AVERAGE_BUCKETS:
+        for double_rate in DOUBLE_RATE_BUCKETS:
+            if not os.path.exists(_table_path((average, double_rate))):
+                get_table((average, double_rate))
+                built += 1
+    return built
+
+
+def warm_tables(app) -> None:
+    """Build any missing tables, for a background thread started with the app"""
+    if np is None:
+        return
+    with app.app_context():
+        build_all_tables()
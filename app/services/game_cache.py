@@ -0,0 +1,415 @@
+"""Bounded in-process cache of hot match and leg data
+
+Every dart used to reload the match, its players and their throwing order,
+none of which change once a match has started, and every scoreboard refresh
+rebuilt the whole leg. This module keeps two small LRU caches per app:
+
+- match metadata: game type and player ids in throwing order
+- leg state: the full game state of a leg, stored with the leg state
+  version it was built from and only served for that same version
+
+Nothing is served from or stored into the caches while the session has
+uncommitted writes. When a session commits, the matches, players and legs
+it wrote are dropped (after_commit, so a rolled back write never evicts
+anything). Every dart bumps the leg state, so a dart always invalidates
+its leg.
+
+Leg entries are checked against the current version, so they are safe
+across worker processes on their own. Match and player details inside a
+cached game state (a match being completed, a player renamed) are only
+dropped in the worker that wrote them unless GAME_CACHE_BROKER is set. The
+workers then share invalidations through a broker; `flask cache-broker`
+runs a small relay that stands in for one locally, and while a worker is
+not connected to it, that worker bypasses its cache. The same link carries
+live events (app.services.live_events) to the streams in every worker.
+"""
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Match, PlayerMatch, Player, Leg, LegState, LegPlayerState, Turn
+from app.services.live_events import broker as live_broker
+from app.utils.metrics import cache_lookups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+BROKER_RETRY_SECONDS = 1.0
+
+# (kind, id) pairs naming what a commit changed
+MATCH, PLAYER, LEG = 'match', 'player', 'leg'
+
+
+class LRUCache:
+    """Thread-safe mapping that forgets its least recently used entry beyond max_entries"""
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, valid: Optional[Callable[[Any], bool]] = None):
+        """The entry for key (None if absent or not valid), counted as a hit or a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None and (valid is None or valid(value)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = 'hit'
+            else:
+                value = None
+                self.misses += 1
+                result = 'miss'
+        cache_lookups.inc((self.name, result))
+        return value
+
+    def put(self, key, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> None:
+        with self._lock:
+            for key in [key for key, value in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+
+class MatchInfo:
+    """What a match needs for scoring and never changes once it has started"""
+    __slots__ = ('id', 'game_type', 'player_ids')
+
+    def __init__(self, match_id: int, game_type: str, player_ids: Tuple[int, ...]):
+        self.id = match_id
+        self.game_type = game_type
+        self.player_ids = player_ids
+
+    def __repr__(self):
+        return f'<MatchInfo {self.id} {self.game_type} players:{self.player_ids}>'
+
+
+class LegEntry:
+    """A leg's game state as built from one leg state version"""
+    __slots__ = ('version', 'match_id', 'player_ids', 'state')
+
+    def __init__(self, version: int, match_id: int, player_ids: Tuple[int, ...], state: Dict[str, Any]):
+        self.version = version
+        self.match_id = match_id
+        self.player_ids = player_ids
+        self.state = state
+
+
+class GameCache:
+    """Match metadata and leg game state caches for one app"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, broker_address: Optional[str] = None):
+        self.matches = LRUCache('match', max_entries)
+        self.legs = LRUCache('leg_state', max_entries)
+        self.link = BrokerLink(broker_address, self) if broker_address else None
+
+    @property
+    def active(self) -> bool:
+        """False while invalidations from other workers could be missed"""
+        return self.link is None or self.link.connected
+
+    def _usable(self) -> bool:
+        return self.active and _session_is_clean(db.session)
+
+    def match_info(self, match_id: int, match: Optional[Match] = None) -> Optional[MatchInfo]:
+        """Game type and throwing order for a match (None if there is no such match)
+
+        A caller that has already loaded the match passes it in to save
+        loading it again on a miss.
+        """
+        usable = self._usable()
+        info = self.matches.get(match_id) if usable else None
+        if info is not None:
+            return info
+
+        if match is None:
+            match = Match.query.options(db.selectinload(Match.player_matches)).filter_by(id=match_id).first()
+        if match is None:
+            return None
+        info = MatchInfo(match.id, match.game_type, tuple(
+            pm.player_id for pm in sorted(match.player_matches, key=lambda x: x.player_order)
+        ))
+        if usable:
+            self.matches.put(match_id, info)
+        return info
+
+    def game_state(self, leg_id: int, version: int) -> Optional[Dict[str, Any]]:
+        """A copy of the cached game state for this leg version, if there is one"""
+        if not self._usable():
+            return None
+        entry = self.legs.get(leg_id, lambda entry: entry.version == version)
+        return dict(entry.state) if entry is not None else None
+
+    def store_game_state(self, leg_id: int, version: int, match_id: int,
+                         player_ids: Iterable[int], state: Dict[str, Any]) -> None:
+        if self._usable():
+            self.legs.put(leg_id, LegEntry(version, match_id, tuple(player_ids), dict(state)))
+
+    def invalidate(self, keys: Iterable[Tuple[str, int]]) -> None:
+        """Drop everything built from the given matches, players and legs"""
+        for kind, key in keys:
+            if kind == MATCH:
+                self.matches.discard(key)
+                self.legs.discard_where(lambda entry: entry.match_id == key)
+            elif kind == PLAYER:
+                self.matches.discard_where(lambda info: key in info.player_ids)
+                self.legs.discard_where(lambda entry: key in entry.player_ids)
+            elif kind == LEG:
+                self.legs.discard(key)
+
+    def clear(self) -> None:
+        self.matches.clear()
+        self.legs.clear()
+
+    def committed(self, keys: Set[Tuple[str, int]]) -> None:
+        """Invalidate what a commit in this process changed, here and in the other workers"""
+        self.invalidate(keys)
+        if self.link is not None:
+            self.link.publish(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {'match': self.matches.stats(), 'leg_state': self.legs.stats(), 'active': self.active}
+        if self.link is not None:
+            stats['broker'] = {'address': self.link.address, 'connected': self.link.connected}
+        return stats
+
+
+def _session_is_clean(session: Session) -> bool:
+    """True when the session has no writes that are not yet committed"""
+    return not (session.info.get('game_cache_keys') or session.new or session.dirty or session.deleted)
+
+
+def _changed_keys(session: Session) -> Set[Tuple[str, int]]:
+    """The matches, players and legs written by a flush
+
+    Throws are left out: every dart also bumps its leg state.
+    """
+    keys = set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Match):
+            keys.add((MATCH, instance.id))
+        elif isinstance(instance, PlayerMatch):
+            keys.add((MATCH, instance.match_id))
+        elif isinstance(instance, Player):
+            keys.add((PLAYER, instance.id))
+        elif isinstance(instance, Leg):
+            keys.add((LEG, instance.id))
+        elif isinstance(instance, (LegState, LegPlayerState, Turn)):
+            keys.add((LEG, instance.leg_id))
+    keys.discard((MATCH, None))
+    keys.discard((PLAYER, None))
+    keys.discard((LEG, None))
+    return keys
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changes(session, flush_context, instances):
+    keys = _changed_keys(session)
+    if keys:
+        session.info.setdefault('game_cache_keys', set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    keys = session.info.pop('game_cache_keys', None)
+    if keys and has_app_context():
+        cache = current_app.extensions.get('game_cache')
+        if cache is not None:
+            cache.committed(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop('game_cache_keys', None)
+
+
+# One JSON value per line: a list of invalidated keys, or {"events": [[channels, message], ...]}
+def _encode(keys: Iterable[Tuple[str, int]]) -> bytes:
+    return (json.dumps(sorted(keys), separators=(',', ':')) + '\n').encode()
+
+
+def _encode_events(events: Iterable[Tuple[Iterable[str], str]]) -> bytes:
+    payload = {'events': [[list(channels), message] for channels, message in events]}
+    return (json.dumps(payload, separators=(',', ':')) + '\n').encode()
+
+
+def _decode(payload: list) -> List[Tuple[str, int]]:
+    return [(kind, key) for kind, key in payload]
+
+
+def _split_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class BrokerLink:
+    """One worker's connection to the invalidation broker
+
+    A daemon thread keeps the connection open, reconnecting every
+    BROKER_RETRY_SECONDS, applies the invalidations other workers publish
+    and hands live events to this worker's streams. The cache is cleared on
+    every (re)connect, since anything published while disconnected was
+    missed.
+    """
+
+    def __init__(self, address: str, cache: GameCache):
+        self.address = address
+        self.cache = cache
+        self._socket: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def connected(self) -> bool:
+        self._ensure_started()
+        return self._socket is not None
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._socket = None
+            threading.Thread(target=self._run, name='game-cache-broker', daemon=True).start()
+
+    def publish(self, keys: Iterable[Tuple[str, int]]) -> None:
+        self._send(_encode(keys))
+
+    def publish_events(self, events: Iterable[Tuple[Iterable[str], str]]) -> bool:
+        """Send live events to every worker's streams, False if they could not be sent"""
+        return self.connected and self._send(_encode_events(events))
+
+    def _send(self, line: bytes) -> bool:
+        sock = self._socket
+        if sock is None:
+            return False
+        try:
+            with self._send_lock:
+                sock.sendall(line)
+        except OSError:
+            logger.warning("Lost the game cache broker at %s", self.address)
+            self._socket = None
+            return False
+        return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                sock = socket.create_connection(_split_address(self.address), timeout=BROKER_RETRY_SECONDS)
+            except OSError:
+                time.sleep(BROKER_RETRY_SECONDS)
+                continue
+
+            sock.settimeout(None)
+            self.cache.clear()
+            self._socket = sock
+            logger.info("Connected to the game cache broker at %s", self.address)
+            try:
+                for line in sock.makefile('rb'):
+                    payload = json.loads(line)
+                    if isinstance(payload, dict):
+                        for channels, message in payload['events']:
+                            live_broker.publish(channels, message)
+                    else:
+                        self.cache.invalidate(_decode(payload))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._socket = None
+                sock.close()
+            logger.warning("Lost the game cache broker at %s", self.address)
+            time.sleep(BROKER_RETRY_SECONDS)
+
+
+class _RelayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.clients.add(self)
+        try:
+            for line in self.rfile:
+                server.relay(line)
+        except OSError:
+            pass
+        finally:
+            with server.lock:
+                server.clients.discard(self)
+
+
+class InvalidationRelay(socketserver.ThreadingTCPServer):
+    """Local stand-in for a pub/sub broker: every line a worker sends goes to every worker, itself included"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: str):
+        super().__init__(_split_address(address), _RelayHandler)
+        self.lock = threading.Lock()
+        self.clients = set()
+
+    def relay(self, line: bytes) -> None:
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.wfile.write(line)
+                client.wfile.flush()
+            except OSError:
+                pass
+
+    def server_close(self):
+        # Disconnect the workers too, so they stop trusting their caches
+        super().server_close()
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def game_cache() -> GameCache:
+    return current_app.extensions['game_cache']
+
+
+def init_game_cache(app: Flask):
+    """One cache per app, sized by GAME_CACHE_SIZE (0 turns it off)"""
+    app.extensions['game_cache'] = GameCache(
+        app.config.get('GAME_CACHE_SIZE', DEFAULT_MAX_ENTRIES),
+        app.config.get('GAME_CACHE_BROKER')
+    )
@@ -0,0 +1,145 @@
+"""Server-Sent Events fan-out for live game updates
+
+Scoring code queues a compact delta on the SQLAlchemy session while it
+works; the delta is published once the transaction commits and dropped if
+it rolls back. Each event is encoded once and the same bytes are handed to
+every subscriber of the leg and match channels, so spectators cost no
+database reads.
+
+Each worker process has its own broker. With GAME_CACHE_BROKER set,
+committed events go out through the game cache broker link instead, which
+relays them to every worker, this one included, so a stream sees throws
+recorded by any worker. Without a connected link they are published in
+this process only.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterator, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+def leg_channel(leg_id: int) -> str:
+    return f'leg:{leg_id}'
+
+
+def match_channel(match_id: int) -> str:
+    return f'match:{match_id}'
+
+
+def format_sse(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode one event in text/event-stream format"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+class LiveEventBroker:
+    """Process-wide publish/subscribe of encoded SSE messages by channel"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._channels[channel].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel: str, subscriber: queue.Queue) -> None:
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def publish(self, channels, message: str) -> None:
+        """Hand an already-encoded message to every subscriber of the channels"""
+        with self._lock:
+            subscribers = set()
+            for channel in channels:
+                subscribers.update(self._channels.get(channel, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Slow consumer: drop its oldest message rather than block scoring
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def stream(self, channel: str, heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+        """Yield SSE messages for a channel until the client disconnects"""
+        subscriber = self.subscribe(channel)
+        try:
+            yield ': connected\n\n'
+            while True:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+        finally:
+            self.unsubscribe(channel, subscriber)
+
+
+broker = LiveEventBroker()
+
+
+def queue_event(session: Session, match_id: int, leg_id: int, event_type: str,
+                data: Dict[str, Any], version: Optional[int] = None) -> None:
+    """Publish an event for a leg and its match when the session next commits"""
+    payload = dict(data, type=event_type, match_id=match_id, leg_id=leg_id, version=version)
+    session.info.setdefault('live_events', []).append(
+        ((leg_channel(leg_id), match_channel(match_id)), format_sse(event_type, payload, version))
+    )
+
+
+def _broker_link():
+    """The worker's game cache broker link, if it has one"""
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get('game_cache')
+    return cache.link if cache is not None else None
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_events(session):
+    events = session.info.pop('live_events', None)
+    if not events:
+        return
+    link = _broker_link()
+    # The broker relays the events back to every worker, this one included
+    if link is not None and link.publish_events(events):
+        return
+    for channels, message in events:
+        broker.publish(channels, message)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_events(session):
+    session.info.pop('live_events', None)
@@ -1,8 +1,19 @@
 """Scoring engine for darts games"""
-from typing import Tuple, Optional, Dict, Any
+import functools
+import logging
+import time
+from datetime import datetime
+from typing import Tuple, Optional, Dict, Any, List
 from enum import Enum
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
-from app.models import Match, Leg, Turn, Throw, Player
+from app.models import Match, Leg, Turn, Throw, LegState, LegPlayerState, PlayerDayStats
+from app.services import x01
+from app.services.game_cache import game_cache
+from app.services.live_events import queue_event
+
+logger = logging.getLogger(__name__)
 
 
 class DartMultiplier(Enum):
@@ -13,45 +24,86 @@ class DartMultiplier(Enum):
     TREBLE = 3
 
 
+class LegConflict(RuntimeError):
+    """Raised when another request changed the leg first; the request can be retried"""
+
+
+# MySQL lock wait timeout and deadlock
+_LOCK_ERROR_CODES = (1205, 1213)
+
+
+def _is_lock_error(error: OperationalError) -> bool:
+    """Whether a database error means the write lost a race for a lock"""
+    args = getattr(error.orig, 'args', ())
+    if args and args[0] in _LOCK_ERROR_CODES:
+        return True
+    return 'database is locked' in str(error.orig)
+
+
+def serialized_leg_write(method):
+    """Roll back a leg write that lost a race with another worker and raise LegConflict
+
+    Writers lock the leg's state row, the leg state's version is checked on
+    every UPDATE, and turns and throws are unique per leg and turn, so a lost
+    race surfaces as one of these errors instead of a duplicate dart. The
+    write engine runs at READ COMMITTED (config.py), so once a writer holds
+    the lock its reads of turns and player states see the writer before it.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except (StaleDataError, IntegrityError, OperationalError) as e:
+            if isinstance(e, OperationalError) and not _is_lock_error(e):
+                raise
+            db.session.rollback()
+            logger.info("Leg write conflict in %s: %s", method.__name__, e)
+            raise LegConflict('The leg was changed by another request, please retry') from e
+    return wrapper
+
+
 class ScoringEngine:
-    """Scoring engine for 501 darts"""
+    """Scoring engine for X01 darts (501 double-out unless a variant engine is used)"""
     
     STARTING_SCORE_501 = 501
+    RULES = x01.DEFAULT_RULES
+    STARTING_SCORE = RULES.starting_score
+    
+    _variant_engines: Dict[str, type] = {}
     
     @staticmethod
-    def calculate_points(segment: int, multiplier: int) -> int:
-        """Calculate points for a dart throw"""
-        if segment == 0:  # Miss
-            return 0
-        elif segment == 25:  # Bull
-            return 25 if multiplier == DartMultiplier.SINGLE.value else 50
-        else:
-            return segment * multiplier
+    def for_game_type(game_type: str) -> type:
+        """Engine class that scores a match's game type"""
+        if game_type == 'cricket':
+            from app.services.cricket_engine import CricketEngine
+            return CricketEngine
+        
+        rules = x01.get_rules(game_type)
+        if rules is ScoringEngine.RULES:
+            return ScoringEngine
+        
+        engine = ScoringEngine._variant_engines.get(game_type)
+        if engine is None:
+            # One engine class per variant, differing only in its rules
+            engine = ScoringEngine._variant_engines[game_type] = type(
+                f'ScoringEngine{game_type.replace("-", "_")}',
+                (ScoringEngine,),
+                {'RULES': rules, 'STARTING_SCORE': rules.starting_score}
+            )
+        return engine
+    
+    # The rules live in the database-free x01 core; these names are kept for callers
+    calculate_points = staticmethod(x01.calculate_points)
+    is_bust = staticmethod(x01.is_bust)
+    validate_dart = staticmethod(x01.validate_dart)
     
     @staticmethod
     def is_valid_checkout(remaining_score: int, points: int, multiplier: int, segment: int) -> bool:
         """Check if a throw would result in a valid checkout"""
-        if remaining_score == points:
-            # Must finish on a double (or bullseye which counts as double)
-            # For bullseye (segment 25), multiplier 2 is double bull (50 points)
-            # For regular segments, multiplier 2 is double
-            if segment == 25:
-                return multiplier == 2  # Must be double bull
-            else:
-                return multiplier == 2  # Must be double
-        return False
-    
-    @staticmethod
-    def is_bust(remaining_score: int, points: int) -> bool:
-        """Check if a throw would result in a bust"""
-        # Bust conditions:
-        # 1. Score goes below 2 (can't finish on 1)
-        # 2. Score goes to 0 but not on a double
-        # 3. Score goes negative
-        new_score = remaining_score - points
-        return new_score < 2 or (new_score == 0 and remaining_score != points)
+        return x01.is_checkout(remaining_score, points, multiplier)
     
     @classmethod
+    @serialized_leg_write
     def process_throw(
         cls,
         leg_id: int,
@@ -60,109 +112,188 @@ class ScoringEngine:
         multiplier: int,
         dart_number: int
     ) -> Dict[str, Any]:
-        """Process a single dart throw - COMPLETE FIXED VERSION"""
-        from app.models import Turn, Throw
-        
-        print(f"=== PROCESS_THROW START ===")
-        print(f"Leg: {leg_id}, Player: {player_id}, Dart: {dart_number}, {multiplier}x{segment}")
+        """Process a single dart throw using the running leg state"""
+        started = time.perf_counter()
         
         # Validate inputs
         if dart_number not in [1, 2, 3]:
             raise ValueError(f"Invalid dart number: {dart_number}. Must be 1, 2, or 3")
         
-        if segment not in list(range(0, 21)) + [25]:
-            raise ValueError(f"Invalid segment: {segment}. Must be 0-20 or 25")
+        cls.validate_dart(segment, multiplier)
         
-        if multiplier not in [0, 1, 2, 3]:
-            raise ValueError(f"Invalid multiplier: {multiplier}. Must be 0-3")
+        # Running state replaces re-summing every turn in the leg; locking it
+        # serializes darts on this leg across workers
+        leg_state = LegState.get_or_create(leg_id, cls.STARTING_SCORE, lock=True)
+        player_state = LegPlayerState.get_or_create(leg_id, player_id, cls.STARTING_SCORE)
+        turn = cls._get_or_start_turn(leg_id, player_id, leg_state, player_state)
         
-        # Get or create current turn
-        turn = Turn.get_last_turn_for_leg(leg_id)
+        # A dart number already recorded in this turn is caught by the unique
+        # (turn_id, dart_number) index on flush and reported as a LegConflict
         
-        print(f"Current turn: {turn.id if turn else 'None'}")
-        if turn:
-            print(f"  Player: {turn.player_id}, Darts thrown: {turn.darts_thrown}, Score: {turn.score}")
+        # Check if this dart number makes sense
+        expected_dart_number = turn.darts_thrown + 1
+        if dart_number != expected_dart_number:
+            logger.warning("Dart number mismatch in turn %s: expected %s, got %s",
+                           turn.id, expected_dart_number, dart_number)
+            # But continue anyway - frontend might have wrong state
         
-        # Check if we need a new turn
-        need_new_turn = False
-        if not turn:
-            print("No current turn - creating new one")
-            need_new_turn = True
-        elif turn.darts_thrown >= 3:
-            print(f"Turn complete ({turn.darts_thrown} darts) - creating new one")
-            need_new_turn = True
-        elif turn.player_id != player_id:
-            print(f"Wrong player (turn:{turn.player_id}, request:{player_id}) - creating new one")
-            need_new_turn = True
-        
-        if need_new_turn:
-            # Get next turn number
-            turn_number = Turn.get_next_turn_number(leg_id)
-            print(f"New turn number: {turn_number}")
-            
-            # Calculate player's current score
-            player_current_score = 501  # Start with 501
-            
-            # Subtract all NON-BUSTED turns for this player
-            player_turns = Turn.query.filter_by(
-                leg_id=leg_id,
-                player_id=player_id,
-                is_bust=False  # ONLY count non-busted turns!
-            ).all()
-            
-            print(f"Found {len(player_turns)} non-busted turns for player {player_id}")
-            for player_turn in player_turns:
-                print(f"  Turn {player_turn.turn_number}: {player_turn.score} points")
-                player_current_score -= player_turn.score
-            
-            print(f"Player {player_id} current score: {player_current_score}")
-            
-            # Create new turn - EXPLICITLY set all fields
-            turn = Turn(
-                leg_id=leg_id,
-                player_id=player_id,
-                turn_number=turn_number,
-                remaining_score=player_current_score,
-                score=0,
-                darts_thrown=0,
-                is_bust=False,
-                is_checkout=False
-            )
-            db.session.add(turn)
-            db.session.flush()  # Get ID without committing
-            print(f"Created new turn ID: {turn.id}")
+        throw = cls._apply_dart(leg_id, player_id, turn, leg_state, player_state, segment, multiplier, dart_number)
         
-        # CRITICAL: Check for duplicate dart number in this turn
-        existing_throw = Throw.query.filter_by(
-            turn_id=turn.id,
-            dart_number=dart_number
-        ).first()
+        db.session.flush()
+        cls._queue_live_event(leg_id, leg_state, 'throw', {
+            'turn': cls._turn_delta(turn),
+            'throws': [cls._throw_delta(throw)]
+        })
+        
+        # Build the response before committing, which expires everything it reads
+        log_fields = cls._dart_log_fields(leg_id, player_id, turn, [throw])
+        result = {
+            'game_completed': turn.is_checkout,  # Game completed on checkout
+            'is_bust': throw.is_bust,
+            'is_checkout': throw.is_checkout,
+            'remaining_score': turn.remaining_score,
+            'throw': throw.to_dict(),
+            'turn': turn.to_dict(),
+            **cls._player_state_fields(player_state)
+        }
+        
+        # Commit everything
+        scored = time.perf_counter()
+        db.session.commit()
+        cls._log_darts('throw', log_fields, started, scored)
+        return result
+    
+    @classmethod
+    @serialized_leg_write
+    def process_visit(
+        cls,
+        leg_id: int,
+        player_id: int,
+        darts: List[Tuple[int, int]],
+        observed: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Process up to three darts for one player in a single transaction
         
-        if existing_throw:
-            print(f"ERROR: Dart {dart_number} already exists in turn {turn.id}!")
-            print(f"Existing throw: ID {existing_throw.id}, {existing_throw.multiplier}x{existing_throw.segment}")
-            raise ValueError(f"Dart {dart_number} already recorded for this turn")
+        darts is a list of (segment, multiplier) pairs. If observed is given
+        ('bust', 'checkout' or 'none') the visit is rejected unless the rules
+        reach the same outcome. Nothing is written if any dart is rejected.
+        """
+        if not darts or len(darts) > 3:
+            raise ValueError(f"A visit must have 1-3 darts, got {len(darts) if darts else 0}")
         
-        # Ensure darts_thrown is valid
-        if turn.darts_thrown is None:
-            print("WARNING: turn.darts_thrown was None, setting to 0")
-            turn.darts_thrown = 0
+        if observed not in (None, 'bust', 'checkout', 'none'):
+            raise ValueError(f"Invalid observed outcome: {observed}. Must be bust, checkout or none")
         
-        # Check if this dart number makes sense
-        expected_dart_number = turn.darts_thrown + 1
-        if dart_number != expected_dart_number:
-            print(f"WARNING: Dart number mismatch. Expected: {expected_dart_number}, Got: {dart_number}")
-            # But continue anyway - frontend might have wrong state
+        for segment, multiplier in darts:
+            cls.validate_dart(segment, multiplier)
         
-        # Calculate points
-        points = cls.calculate_points(segment, multiplier)
-        print(f"Points: {points} ({multiplier}x{segment})")
+        started = time.perf_counter()
+        leg_state = LegState.get_or_create(leg_id, cls.STARTING_SCORE, lock=True)
+        player_state = LegPlayerState.get_or_create(leg_id, player_id, cls.STARTING_SCORE)
+        turn = cls._get_or_start_turn(leg_id, player_id, leg_state, player_state)
         
-        # Check for bust
-        new_remaining = turn.remaining_score - points
-        is_bust = new_remaining < 2 or (new_remaining == 0 and multiplier != 2 and segment != 25)
+        if turn.darts_thrown + len(darts) > 3:
+            raise ValueError(f"Turn already has {turn.darts_thrown} darts, cannot add {len(darts)} more")
         
-        print(f"Bust check: {turn.remaining_score} - {points} = {new_remaining}, is_bust: {is_bust}")
+        throws = []
+        for segment, multiplier in darts:
+            if turn.is_bust or turn.is_checkout:
+                raise ValueError(f"Visit ended on dart {turn.darts_thrown}, {len(darts) - len(throws)} darts left over")
+            
+            dart_number = turn.darts_thrown + 1
+            throws.append(cls._apply_dart(
+                leg_id, player_id, turn, leg_state, player_state, segment, multiplier, dart_number
+            ))
+        
+        outcome = 'bust' if turn.is_bust else 'checkout' if turn.is_checkout else 'none'
+        if observed is not None and observed != outcome:
+            raise ValueError(f"Observed {observed} but the darts score as {outcome}")
+        
+        db.session.flush()
+        cls._queue_live_event(leg_id, leg_state, 'throw', {
+            'turn': cls._turn_delta(turn),
+            'throws': [cls._throw_delta(throw) for throw in throws]
+        })
+        
+        # Build the response before committing, which expires everything it reads
+        log_fields = cls._dart_log_fields(leg_id, player_id, turn, throws)
+        result = {
+            'game_completed': turn.is_checkout,
+            'is_bust': turn.is_bust,
+            'is_checkout': turn.is_checkout,
+            'remaining_score': turn.remaining_score,
+            'throws': [throw.to_dict() for throw in throws],
+            'turn': turn.to_dict(),
+            **cls._player_state_fields(player_state)
+        }
+        
+        scored = time.perf_counter()
+        db.session.commit()
+        cls._log_darts('visit', log_fields, started, scored)
+        return result
+    
+    @classmethod
+    def _get_or_start_turn(
+        cls,
+        leg_id: int,
+        player_id: int,
+        leg_state: LegState,
+        player_state: LegPlayerState
+    ) -> Turn:
+        """Return the player's open turn, starting a new one if needed"""
+        turn = db.session.get(Turn, leg_state.current_turn_id) if leg_state.current_turn_id else None
+        
+        # A new turn starts when there is none, it is full, it ended, or it is someone else's
+        need_new_turn = (
+            not turn
+            or turn.darts_thrown >= 3
+            or turn.is_bust
+            or turn.is_checkout
+            or turn.player_id != player_id
+        )
+        
+        if not need_new_turn:
+            return turn
+        
+        turn_number = leg_state.last_turn_number + 1
+        
+        # Create new turn - EXPLICITLY set all fields
+        turn = Turn(
+            leg_id=leg_id,
+            player_id=player_id,
+            turn_number=turn_number,
+            remaining_score=player_state.remaining_score,
+            score=0,
+            darts_thrown=0,
+            is_bust=False,
+            is_checkout=False,
+            throws=[]  # Known to be empty, so the response never loads it
+        )
+        db.session.add(turn)
+        db.session.flush()  # Get ID without committing
+        logger.debug("Leg %s: turn %s (#%s) started for player %s on %s",
+                     leg_id, turn.id, turn_number, player_id, player_state.remaining_score)
+        
+        leg_state.current_turn_id = turn.id
+        leg_state.last_turn_number = turn_number
+        return turn
+    
+    @classmethod
+    def _apply_dart(
+        cls,
+        leg_id: int,
+        player_id: int,
+        turn: Turn,
+        leg_state: LegState,
+        player_state: LegPlayerState,
+        segment: int,
+        multiplier: int,
+        dart_number: int
+    ) -> Throw:
+        """Score one dart against the turn, running state and day rollup without committing"""
+        score_before = turn.score
+        state = cls._turn_state(turn)
+        dart = state.throw(segment, multiplier)
         
         # Create throw
         throw = Throw(
@@ -170,77 +301,141 @@ class ScoringEngine:
             dart_number=dart_number,
             segment=segment,
             multiplier=multiplier,
-            points=points,
-            is_bust=is_bust,
-            is_checkout=False
+            points=dart.points,
+            is_bust=dart.is_bust,
+            is_checkout=dart.is_checkout
+        )
+        # Through the collection, so the response's turn.to_dict() includes it
+        turn.throws.append(throw)
+        cls._store_turn_state(turn, state)
+        
+        if dart.is_checkout:
+            leg = db.session.get(Leg, leg_id)
+            leg.status = 'completed'
+            leg.winning_player_id = player_id
+            leg.end_time = datetime.utcnow()
+        
+        # Keep the running state in step with the turn
+        player_state.remaining_score = turn.remaining_score
+        player_state.darts_thrown += 1
+        if turn.darts_thrown == 1:
+            player_state.visits = (player_state.visits or 0) + 1
+        player_state.bump()
+        leg_state.bump(turn)
+        
+        # Same transaction as the dart, so the rollup never disagrees with the throws
+        PlayerDayStats.add_dart(
+            player_id, PlayerDayStats.day_of(turn),
+            PlayerDayStats.dart_changes(segment, multiplier, turn.score - score_before, player_state.visits),
+            turn.score if not state.is_open else None,
+            turn.remaining_score + turn.score if dart.is_checkout else None
         )
-        db.session.add(throw)
-        
-        if is_bust:
-            print("BUST DETECTED!")
-            throw.is_bust = True
-            turn.is_bust = True
-            turn.score = 0  # Bust means 0 points for the entire turn
-            # DO NOT update remaining_score - it stays the same!
-            print(f"Bust: Turn score set to 0, remaining stays at {turn.remaining_score}")
-        else:
-            # Valid throw
-            turn.score += points
-            turn.remaining_score = new_remaining
-            
-            print(f"Valid throw: Turn score now {turn.score}, remaining {turn.remaining_score}")
-            
-            # Check for checkout (must finish on double)
-            if new_remaining == 0:
-                print("CHECKOUT ATTEMPT!")
-                if segment == 25:
-                    is_checkout = multiplier == 2  # Double bull
-                else:
-                    is_checkout = multiplier == 2  # Double
-                
-                if is_checkout:
-                    print("SUCCESSFUL CHECKOUT!")
-                    throw.is_checkout = True
-                    turn.is_checkout = True
-                else:
-                    print("INVALID CHECKOUT - not a double!")
-                    # This should actually be a bust!
-                    throw.is_bust = True
-                    turn.is_bust = True
-                    turn.score = 0  # Revert score
-                    turn.remaining_score += points  # Add points back
-                    is_bust = True
-                    print(f"Invalid checkout - treated as bust. Score reverted to {turn.score}")
-        
-        # Increment darts thrown
-        turn.darts_thrown += 1
-        print(f"Darts thrown updated to: {turn.darts_thrown}")
-        
-        # Commit everything
-        db.session.add(turn)
-        db.session.commit()
-        
-        print(f"=== PROCESS_THROW END ===")
-        print(f"Turn ID: {turn.id}, Throw ID: {throw.id}")
-        print(f"Final state - Score: {turn.score}, Remaining: {turn.remaining_score}, Bust: {turn.is_bust}")
         
-        # Return response
+        return throw
+
+    @staticmethod
+    def _player_state_fields(player_state: LegPlayerState) -> Dict[str, Any]:
+        """Game-specific fields added to throw results (none for X01)"""
+        return {}
+    
+    @classmethod
+    def _turn_state(cls, turn: Turn, throws: Optional[List[Throw]] = None) -> x01.TurnState:
+        """In-memory copy of a stored turn (pass its throws when the darts are needed, e.g. for undo)"""
+        start_score = turn.remaining_score + turn.score
+        if throws is not None:
+            return x01.TurnState.from_darts(
+                turn.player_id, turn.turn_number, start_score,
+                [(throw.segment, throw.multiplier) for throw in throws],
+                cls.RULES
+            )
+        return x01.TurnState(
+            turn.player_id, turn.turn_number, start_score, turn.score,
+            turn.darts_thrown, turn.is_bust, turn.is_checkout, rules=cls.RULES
+        )
+    
+    @staticmethod
+    def _store_turn_state(turn: Turn, state: x01.TurnState) -> None:
+        """Copy an in-memory turn's totals back onto the stored turn"""
+        turn.score = state.score
+        turn.remaining_score = state.remaining_score
+        turn.darts_thrown = state.darts_thrown
+        turn.is_bust = state.is_bust
+        turn.is_checkout = state.is_checkout
+    
+    @staticmethod
+    def _dart_log_fields(leg_id: int, player_id: int, turn: Turn, throws: List[Throw]) -> Optional[Dict[str, Any]]:
+        """Fields for the per-throw log event, read before commit expires them (None if not logged)"""
+        if not logger.isEnabledFor(logging.INFO):
+            return None
         return {
-            'game_completed': turn.is_checkout,  # Game completed on checkout
-            'is_bust': is_bust,
-            'is_checkout': throw.is_checkout,
+            'leg_id': leg_id,
+            'player_id': player_id,
+            'turn_id': turn.id,
+            'darts': [(t.segment, t.multiplier) for t in throws],
+            'points': sum(t.points for t in throws),
+            'remaining': turn.remaining_score,
+            'bust': turn.is_bust,
+            'checkout': turn.is_checkout
+        }
+    
+    @staticmethod
+    def _log_darts(kind: str, fields: Optional[Dict[str, Any]], started: float, scored: float) -> None:
+        """Emit one compact event for the darts just committed, with timings in ms"""
+        if fields is None:
+            return
+        finished = time.perf_counter()
+        fields['score_ms'] = round((scored - started) * 1000, 3)
+        fields['commit_ms'] = round((finished - scored) * 1000, 3)
+        fields['total_ms'] = round((finished - started) * 1000, 3)
+        logger.info(kind, extra={'fields': fields})
+    
+    @staticmethod
+    def _turn_delta(turn: Turn) -> Dict[str, Any]:
+        """Compact turn fields for live events (throws are sent separately)"""
+        return {
+            'id': turn.id,
+            'player_id': turn.player_id,
+            'turn_number': turn.turn_number,
+            'score': turn.score,
             'remaining_score': turn.remaining_score,
-            'throw': throw.to_dict(),
-            'turn': turn.to_dict()
+            'darts_thrown': turn.darts_thrown,
+            'is_bust': turn.is_bust,
+            'is_checkout': turn.is_checkout
         }
-
+    
+    @staticmethod
+    def _throw_delta(throw: Throw) -> Dict[str, Any]:
+        """Compact throw fields for live events"""
+        return {
+            'id': throw.id,
+            'turn_id': throw.turn_id,
+            'dart_number': throw.dart_number,
+            'segment': throw.segment,
+            'multiplier': throw.multiplier,
+            'points': throw.points,
+            'is_bust': throw.is_bust,
+            'is_checkout': throw.is_checkout
+        }
+    
+    @staticmethod
+    def _queue_live_event(leg_id: int, leg_state: LegState, event_type: str, data: Dict[str, Any]) -> None:
+        """Queue a delta for leg and match subscribers, sent when the session commits"""
+        leg = db.session.get(Leg, leg_id)  # Already in the session for every caller
+        queue_event(db.session, leg.match_id, leg_id, event_type, data, leg_state.version)
+    
     @classmethod
     def get_player_current_score(cls, leg_id: int, player_id: int) -> int:
         """Get a player's current score in a leg"""
-        # Start with 501
-        total_score = 501
+        player_state = db.session.get(LegPlayerState, (leg_id, player_id))
+        if player_state:
+            return player_state.remaining_score
+        
+        if db.session.get(LegState, leg_id):
+            # Player has not thrown in this leg yet
+            return cls.STARTING_SCORE
         
-        # Subtract all non-busted turns for this player
+        # Leg predates the running state - subtract all non-busted turns
+        total_score = cls.STARTING_SCORE
         turns = Turn.query.filter_by(
             leg_id=leg_id,
             player_id=player_id,
@@ -253,57 +448,69 @@ class ScoringEngine:
         return total_score
     
     @classmethod
+    @serialized_leg_write
     def undo_last_throw(cls, leg_id: int) -> Optional[Dict[str, Any]]:
         """Undo the last throw in a leg"""
+        leg_state = LegState.get_or_create(leg_id, cls.STARTING_SCORE, lock=True)
+        if not leg_state.current_turn_id:
+            return None
+        
         # Get the last turn
-        turn = Turn.get_last_turn_for_leg(leg_id)
+        turn = db.session.get(Turn, leg_state.current_turn_id)
         if not turn:
             return None
         
-        # Get the last throw
-        throw = Throw.get_last_throw_for_turn(turn.id)
+        player_state = LegPlayerState.get_or_create(leg_id, turn.player_id, cls.STARTING_SCORE)
+        
+        # Remove the last throw and rewind the turn and player
+        throw = cls._undo_dart(turn, player_state)
         if not throw:
             return None
-        
-        # Store data before deletion
         throw_data = throw.to_dict()
+        # Through the collection, so deleting an emptied turn below cannot delete the throw twice
+        turn.throws.remove(throw)
         
-        # Remove the throw
-        db.session.delete(throw)
-        
-        # Update turn
-        turn.darts_thrown -= 1
-        
-        if throw.is_bust:
-            # Remove bust flag
-            turn.is_bust = False
-        elif throw.is_checkout:
-            # Remove checkout flag and reset leg
-            turn.is_checkout = False
-            turn.score -= throw.points
-            turn.remaining_score += throw.points
-            
+        if throw.is_checkout:
             # Reset leg completion
-            leg = Leg.get_by_id(leg_id)
+            leg = db.session.get(Leg, leg_id)
             leg.status = 'active'
             leg.winning_player_id = None
             leg.end_time = None
-            db.session.add(leg)
-        else:
-            # Normal throw - subtract points
-            turn.score -= throw.points
-            turn.remaining_score += throw.points
+        
+        player_state.darts_thrown -= 1
+        player_state.bump()
+        leg_state.bump(turn)
         
         # If no throws left in turn, delete the turn
         if turn.darts_thrown == 0:
+            player_state.visits -= 1
+            leg_state.reset_version = leg_state.version
+            previous_turn = Turn.query.filter(
+                Turn.leg_id == leg_id,
+                Turn.turn_number < turn.turn_number
+            ).order_by(Turn.turn_number.desc()).first()
+            
+            leg_state.current_turn_id = previous_turn.id if previous_turn else None
+            leg_state.last_turn_number = previous_turn.turn_number if previous_turn else 0
+            
+            cls._queue_live_event(leg_id, leg_state, 'undo', {
+                'throw_removed': throw_data['id'],
+                'turn_removed': turn.id
+            })
+            
             db.session.delete(turn)
             db.session.commit()
             return {
                 'throw_removed': throw_data,
                 'turn_removed': True,
-                'remaining_score': turn.remaining_score + throw.points if turn else cls.STARTING_SCORE_501
+                'remaining_score': player_state.remaining_score
             }
         
+        cls._queue_live_event(leg_id, leg_state, 'undo', {
+            'throw_removed': throw_data['id'],
+            'turn': cls._turn_delta(turn)
+        })
+        
         db.session.commit()
         
         return {
@@ -313,6 +520,36 @@ class ScoringEngine:
             'turn': turn.to_dict()
         }
     
+    @classmethod
+    def _undo_dart(cls, turn: Turn, player_state: LegPlayerState) -> Optional[Throw]:
+        """Rewind the turn, player score and day rollup past its last throw, returning that throw (None if empty)"""
+        # Rescoring the turn's darts also recovers the score before a bust
+        throws = sorted(turn.throws, key=lambda t: t.dart_number)
+        if not throws:
+            return None
+        
+        score_before = turn.score
+        visit_before = score_before if PlayerDayStats.visit_over(turn.darts_thrown, turn.is_bust, turn.is_checkout) else None
+        finish = turn.remaining_score + turn.score if turn.is_checkout else None
+        state = cls._turn_state(turn, throws)
+        state.undo()
+        cls._store_turn_state(turn, state)
+        player_state.remaining_score = turn.remaining_score
+        
+        throw = throws[-1]
+        day_stats = PlayerDayStats.get_or_create(turn.player_id, PlayerDayStats.day_of(turn), lock=True)
+        day_stats.apply(PlayerDayStats.dart_changes(
+            throw.segment, throw.multiplier, turn.score - score_before, player_state.visits, sign=-1
+        ))
+        if throw.is_checkout:
+            day_stats.checkouts -= 1
+        # A best cannot be taken back by subtraction; look it up again if this visit held it
+        # (it is open again now, so it no longer counts)
+        if (visit_before is not None and visit_before >= day_stats.best_visit > 0) or \
+                (finish is not None and finish >= day_stats.best_finish):
+            day_stats.refresh_bests()
+        return throw
+    
     @classmethod
     def start_new_leg(cls, match_id: int, starting_player_id: int) -> Dict[str, Any]:
         """Start a new leg in a match"""
@@ -329,53 +566,165 @@ class ScoringEngine:
         leg = Leg.create_for_match(match_id, leg_number, starting_player_id)
         
         return {
-            'leg': leg.to_dict(),
+            'leg': leg.to_dict(include=()),
             'match_id': match_id,
             'leg_number': leg_number,
             'starting_player_id': starting_player_id
         }
     
     @classmethod
-    def get_current_game_state(cls, leg_id: int) -> Dict[str, Any]:
-        """Get current game state for a leg"""
+    def get_current_game_state(cls, leg_id: int, since_version: Optional[int] = None) -> Dict[str, Any]:
+        """Get current game state for a leg
+        
+        With since_version, turns holds only the turns changed after that
+        version and match and players are left out (delta is True), unless a
+        turn has been removed since then or the version is unknown, in which
+        case the full state is returned. Full states are cached per leg state
+        version.
+        """
+        cache = game_cache()
+        leg_state = db.session.get(LegState, leg_id)
+        delta = since_version is not None and leg_state is not None and leg_state.can_diff_from(since_version)
+        if leg_state is not None and not delta:
+            state = cache.game_state(leg_id, leg_state.version)
+            if state is not None:
+                return state
+        
         leg = Leg.get_by_id(leg_id)
         if not leg:
             raise ValueError(f"Leg {leg_id} not found")
         
-        # Get all turns for this leg
-        turns = Turn.query.filter_by(leg_id=leg_id).order_by(Turn.turn_number).all()
-        
-        # Get players in the match
-        match = Match.get_by_id(leg.match_id)
-        players = [pm.player.to_dict() for pm in match.player_matches]
+        turns_query = Turn.query.options(db.selectinload(Turn.throws)).filter_by(leg_id=leg_id)
+        if delta:
+            # Only what changed; the open or last turn comes from the running state
+            turns = turns_query.filter(Turn.version > since_version).order_by(Turn.turn_number).all()
+            last_turn = db.session.get(Turn, leg_state.current_turn_id) if leg_state.current_turn_id else None
+        else:
+            # Get all turns for this leg with their throws
+            turns = turns_query.order_by(Turn.turn_number).all()
+            last_turn = turns[-1] if turns else None
+        
+        # Players in throwing order; a delta leaves out the match and players
+        match = None
+        if not delta:
+            match = Match.query.options(*Match.loader_options(('players',))).filter_by(id=leg.match_id).first()
+            players = [
+                pm.player.to_dict() for pm in sorted(match.player_matches, key=lambda x: x.player_order)
+            ]
+        info = cache.match_info(leg.match_id, match)
+        player_ids = list(info.player_ids)
         
         # Calculate current player
         current_player_id = None
         current_turn = None
-        if turns:
-            last_turn = turns[-1]
+        if last_turn:
             if last_turn.darts_thrown < 3 and not last_turn.is_bust and not last_turn.is_checkout:
                 current_player_id = last_turn.player_id
                 current_turn = last_turn.to_dict()
             else:
                 # Determine next player
-                player_matches = match.player_matches
-                player_ids = [pm.player_id for pm in sorted(player_matches, key=lambda x: x.player_order)]
-                
-                if last_turn:
-                    current_index = player_ids.index(last_turn.player_id)
-                    next_index = (current_index + 1) % len(player_ids)
-                    current_player_id = player_ids[next_index]
+                current_index = player_ids.index(last_turn.player_id)
+                next_index = (current_index + 1) % len(player_ids)
+                current_player_id = player_ids[next_index]
         else:
             # First turn of the leg
             current_player_id = leg.starting_player_id
         
-        return {
-            'leg': leg.to_dict(),
-            'match': match.to_dict(),
-            'players': players,
+        state = {
+            'leg': leg.to_dict(include=()),
             'current_player_id': current_player_id,
             'current_turn': current_turn,
             'turns': [turn.to_dict() for turn in turns],
-            'game_type': match.game_type
+            'version': leg_state.version if leg_state else None,
+            'delta': delta,
+            'game_type': info.game_type,
+            **cls._scoreboard_fields(leg, player_ids, current_player_id, current_turn)
+        }
+        if not delta:
+            # Match details and players never change during a leg, so deltas leave them out
+            state['match'] = match.to_dict(include=())
+            state['players'] = players
+            if leg_state is not None:
+                cache.store_game_state(leg_id, leg_state.version, leg.match_id, player_ids, state)
+        return state
+    
+    @classmethod
+    def _scoreboard_fields(
+        cls,
+        leg: Leg,
+        player_ids: List[int],
+        current_player_id: Optional[int],
+        current_turn: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Game-specific game state: the suggested finish and live win probability for X01"""
+        rules = cls.RULES
+        suggested_checkout = None
+        win_probability = None
+        if current_player_id and leg.status == 'active':
+            # Suggest a finish for the player at the oche
+            if current_turn:
+                remaining_score = current_turn['remaining_score']
+                darts_left = 3 - current_turn['darts_thrown']
+            else:
+                remaining_score = cls.get_player_current_score(leg.id, current_player_id)
+                darts_left = 3
+            if not (rules.double_in and remaining_score == rules.starting_score):
+                suggested_checkout = cls.suggest_checkout(remaining_score, darts_left, out_rule=rules.out_rule)
+            # The expected-darts tables model straight-in, double-out legs
+            if not rules.double_in and rules.out_rule == x01.DOUBLE_OUT:
+                win_probability = cls._live_win_probability(leg.id, player_ids, current_player_id, current_turn)
+        
+        return {
+            'starting_score': rules.starting_score,
+            'suggested_checkout': suggested_checkout,
+            'win_probability': win_probability
+        }
+    
+    @classmethod
+    def _live_win_probability(
+        cls,
+        leg_id: int,
+        player_ids: List[int],
+        current_player_id: int,
+        current_turn: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[int, float]]:
+        """Each player's chance of winning the leg from the expected-darts tables (None if unavailable)"""
+        from app.services.expected_darts import live_win_probability
+        
+        # Throwing order starting with the player at the oche
+        start = player_ids.index(current_player_id)
+        order = player_ids[start:] + player_ids[:start]
+        remaining = [cls.get_player_current_score(leg_id, player_id) for player_id in order]
+        
+        if current_turn:
+            darts_left = 3 - current_turn['darts_thrown']
+            turn_start = current_turn['remaining_score'] + current_turn['score']
+        else:
+            darts_left = 3
+            turn_start = remaining[0]
+        
+        return live_win_probability(order, remaining, darts_left, turn_start)
+    
+    @staticmethod
+    def suggest_checkout(
+        remaining_score: int,
+        darts_left: int = 3,
+        preferred_double: Optional[int] = None,
+        out_rule: str = x01.DOUBLE_OUT
+    ) -> Optional[Dict[str, Any]]:
+        """Best finishing route for the out rule from the precomputed checkout table, if any"""
+        from flask import current_app
+        from app.services.checkout_table import checkout_table_for
+        
+        if preferred_double is None:
+            preferred_double = current_app.config.get('PREFERRED_DOUBLE')
+        
+        route = checkout_table_for(out_rule).build().best(remaining_score, darts_left, preferred_double)
+        if not route:
+            return None
+        
+        return {
+            'remaining_score': remaining_score,
+            'darts_left': darts_left,
+            **route
         }
\ No newline at end of file
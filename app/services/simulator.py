@@ -0,0 +1,282 @@
+"""Monte Carlo win-probability forecasts for X01 legs
+
+Thousands of copies of a leg are played out at once with NumPy, one dart
+per step across every unfinished copy, using the same bust and checkout
+rules as the x01 core. Each player's darts are drawn from what they have
+actually thrown:
+
+- Scoring darts (remaining above 60) sample the points distribution of
+  their darts in turns that started above 170.
+- Finishing darts (an even score of 40 or less, or 50) hit the double at
+  their historical rate: checkouts per dart thrown in turns that started on
+  such a finish. A miss lands in the single half the time and outside the
+  board otherwise.
+- Set-up darts (61 down to a finish) aim to leave 32 or 40 and hit the
+  intended single at SETUP_ACCURACY, otherwise a random single.
+
+Players with little history are blended towards a club-level prior.
+NumPy is optional: forecast functions raise SimulatorUnavailable without it.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from app import db
+from app.models import Leg, Match, Throw, Turn
+from app.services import x01
+from app.utils.stats_db import stats_session
+
+DEFAULT_SIMULATIONS = 2000
+MAX_SIMULATIONS = 20000
+MAX_DARTS_PER_PLAYER = 200
+
+SCORING_TURN_START = 170
+FINISH_MAX = 40
+SETUP_ACCURACY = 0.7
+
+# Club-level prior for a scoring dart (points -> probability) and for doubles
+PRIOR_SCORE_DISTRIBUTION = {
+    0: 0.05, 1: 0.12, 2: 0.025, 3: 0.03, 5: 0.12, 10: 0.025,
+    15: 0.03, 20: 0.45, 40: 0.05, 60: 0.1
+}
+PRIOR_DOUBLE_RATE = 0.2
+PRIOR_SCORING_DARTS = 30
+PRIOR_FINISHING_DARTS = 20
+
+
+class SimulatorUnavailable(RuntimeError):
+    """Raised when NumPy is not installed"""
+
+
+def _require_numpy():
+    if np is None:
+        raise SimulatorUnavailable('Forecasts need NumPy (pip install numpy)')
+
+
+def estimate_skills(player_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Scoring distribution (probability per points 0-60) and double rate for each player"""
+    _require_numpy()
+
+    # Skill estimates are history aggregations, so they read from the stats bind
+    session = stats_session()
+    turn_start = Turn.remaining_score + Turn.score
+    scoring_rows = session.query(
+        Turn.player_id,
+        Throw.points,
+        db.func.count(Throw.id)
+    ).join(
+        Turn, Throw.turn_id == Turn.id
+    ).join(
+        Leg, Turn.leg_id == Leg.id
+    ).join(
+        Match, Leg.match_id == Match.id
+    ).filter(
+        Turn.player_id.in_(player_ids),
+        Match.game_type == '501',
+        turn_start > SCORING_TURN_START
+    ).group_by(Turn.player_id, Throw.points).all()
+
+    finishing_rows = session.query(
+        Turn.player_id,
+        db.func.count(Throw.id),
+        db.func.sum(db.case((Throw.is_checkout == True, 1), else_=0))
+    ).join(
+        Turn, Throw.turn_id == Turn.id
+    ).join(
+        Leg, Turn.leg_id == Leg.id
+    ).join(
+        Match, Leg.match_id == Match.id
+    ).filter(
+        Turn.player_id.in_(player_ids),
+        Match.game_type == '501',
+        turn_start <= FINISH_MAX,
+        turn_start % 2 == 0
+    ).group_by(Turn.player_id).all()
+
+    prior = np.zeros(61)
+    for points, probability in PRIOR_SCORE_DISTRIBUTION.items():
+        prior[points] = probability
+
+    counts = {player_id: np.zeros(61) for player_id in player_ids}
+    for player_id, points, count in scoring_rows:
+        if 0 <= points <= 60:
+            counts[player_id][points] += count
+
+    finishing = {player_id: (darts, checkouts or 0) for player_id, darts, checkouts in finishing_rows}
+
+    skills = {}
+    for player_id in player_ids:
+        scoring_counts = counts[player_id] + prior * PRIOR_SCORING_DARTS
+        darts, checkouts = finishing.get(player_id, (0, 0))
+        skills[player_id] = {
+            'score_distribution': scoring_counts / scoring_counts.sum(),
+            'double_rate': (checkouts + PRIOR_DOUBLE_RATE * PRIOR_FINISHING_DARTS) / (darts + PRIOR_FINISHING_DARTS),
+            'scoring_darts': int(counts[player_id].sum()),
+            'finishing_darts': int(darts)
+        }
+    return skills
+
+
+def simulate(
+    remaining: List[int],
+    current: int,
+    darts_in_turn: int,
+    turn_start: int,
+    skills: List[Dict[str, Any]],
+    simulations: int = DEFAULT_SIMULATIONS,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Play a leg out many times from a position
+
+    remaining is each player's score in throwing order, current the index of
+    the player at the oche, who has thrown darts_in_turn darts in a turn that
+    started on turn_start. Returns per-player win probabilities and mean
+    darts to finish in the simulations they won.
+    """
+    _require_numpy()
+
+    rng = np.random.default_rng(seed)
+    players = len(remaining)
+    score_cdfs = np.array([np.cumsum(skill['score_distribution']) for skill in skills])
+    score_cdfs[:, -1] = 1.0
+    double_rates = np.array([skill['double_rate'] for skill in skills])
+
+    scores = np.tile(np.array(remaining, dtype=np.int64), (simulations, 1))
+    darts = np.zeros((simulations, players), dtype=np.int64)
+    player = np.full(simulations, current, dtype=np.int64)
+    in_turn = np.full(simulations, darts_in_turn, dtype=np.int64)
+    start = np.full(simulations, turn_start, dtype=np.int64)
+    winner = np.full(simulations, -1, dtype=np.int64)
+    active = np.arange(simulations)
+
+    for _ in range(MAX_DARTS_PER_PLAYER * players):
+        if active.size == 0:
+            break
+
+        p = player[active]
+        r = scores[active, p]
+        roll = rng.random(active.size)
+
+        finishing = ((r <= FINISH_MAX) & (r % 2 == 0)) | (r == 50)
+        setup = ~finishing & (r <= 60)
+        scoring = ~finishing & ~setup
+
+        points = np.zeros(active.size, dtype=np.int64)
+        on_double = np.zeros(active.size, dtype=bool)
+
+        # Scoring darts: inverse-CDF sample of the player's points distribution
+        for index in range(players):
+            mask = scoring & (p == index)
+            if mask.any():
+                points[mask] = np.searchsorted(score_cdfs[index], roll[mask], side='right')
+
+        # Double attempts: hit, single of the same number, or off the board
+        hit = finishing & (roll < double_rates[p])
+        single = finishing & ~hit & (rng.random(active.size) < 0.5)
+        points[hit] = r[hit]
+        on_double[hit] = True
+        points[single] = np.where(r[single] == 50, 25, r[single] // 2)
+
+        # Set-up darts: aim to leave 32 (or 40), else any single
+        target = np.where((r - 32 >= 1) & (r - 32 <= 20), r - 32, np.where(r - 40 >= 1, r - 40, 1))
+        accurate = setup & (roll < SETUP_ACCURACY)
+        stray = setup & ~accurate
+        points[accurate] = target[accurate]
+        points[stray] = rng.integers(1, 21, stray.sum())
+
+        # Same rules as x01.is_bust / x01.is_checkout
+        new_scores = r - points
+        bust = (new_scores < 0) | (new_scores == 1) | ((new_scores == 0) & ~on_double)
+        checkout = (new_scores == 0) & on_double
+
+        darts[active, p] += 1
+        scores[active, p] = np.where(bust, start[active], new_scores)
+        in_turn[active] += 1
+
+        winner[active[checkout]] = p[checkout]
+
+        turn_over = (bust | (in_turn[active] == x01.DARTS_PER_TURN)) & ~checkout
+        changing = active[turn_over]
+        next_player = (player[changing] + 1) % players
+        player[changing] = next_player
+        in_turn[changing] = 0
+        start[changing] = scores[changing, next_player]
+
+        active = active[~checkout]
+
+    results = []
+    for index in range(players):
+        won = winner == index
+        results.append({
+            'win_probability': round(float(won.mean()), 4),
+            'expected_darts_to_finish': round(float(darts[won, index].mean()), 1) if won.any() else None
+        })
+
+    finished = winner >= 0
+    return {
+        'players': results,
+        'expected_darts_remaining': round(float(darts[finished].sum(axis=1).mean()), 1) if finished.any() else None,
+        'unfinished': int((~finished).sum())
+    }
+
+
+def forecast_leg(leg_id: int, simulations: int = DEFAULT_SIMULATIONS, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Win probabilities for the players in a leg from its current state"""
+    from app.services.scoring_engine import ScoringEngine
+
+    _require_numpy()
+    started = time.perf_counter()
+
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"simulations must be 1-{MAX_SIMULATIONS}, got {simulations}")
+
+    game_state = ScoringEngine.get_current_game_state(leg_id)
+    if game_state['game_type'] != '501':
+        raise ValueError(f"Forecasts are only available for 501, not {game_state['game_type']}")
+    if game_state['leg']['status'] != 'active':
+        raise ValueError(f"Leg {leg_id} is not active")
+
+    # Throwing order from the player at the oche
+    player_ids = [player['id'] for player in game_state['players']]
+    current_player_id = game_state['current_player_id']
+    current = player_ids.index(current_player_id)
+
+    remaining = [ScoringEngine.get_player_current_score(leg_id, player_id) for player_id in player_ids]
+    current_turn = game_state['current_turn']
+    if current_turn:
+        darts_in_turn = current_turn['darts_thrown']
+        turn_start = current_turn['remaining_score'] + current_turn['score']
+    else:
+        darts_in_turn = 0
+        turn_start = remaining[current]
+
+    skills = estimate_skills(player_ids)
+    outcome = simulate(
+        remaining, current, darts_in_turn, turn_start,
+        [skills[player_id] for player_id in player_ids],
+        simulations, seed
+    )
+
+    players = []
+    for player_id, score, result in zip(player_ids, remaining, outcome['players']):
+        skill = skills[player_id]
+        players.append({
+            'player_id': player_id,
+            'remaining_score': score,
+            'double_rate': round(float(skill['double_rate']), 3),
+            'history_darts': skill['scoring_darts'] + skill['finishing_darts'],
+            **result
+        })
+
+    return {
+        'leg_id': leg_id,
+        'current_player_id': current_player_id,
+        'simulations': simulations,
+        'players': players,
+        'expected_darts_remaining': outcome['expected_darts_remaining'],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
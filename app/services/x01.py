@@ -0,0 +1,317 @@
+"""In-memory X01 scoring rules
+
+Everything here is plain Python with no database or Flask dependency, so
+legs can be scored, simulated, replayed and validated without a session.
+ScoringEngine persists the same state through the ORM models.
+
+Points and each variant's legal opening and finishing darts are lookup
+tables indexed by [segment][multiplier], built once at import, so scoring
+a dart is a few table reads whatever the variant.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+MISS, SINGLE, DOUBLE, TREBLE = 0, 1, 2, 3
+BULL = 25
+VALID_SEGMENTS = frozenset(range(0, 21)) | {BULL}
+VALID_MULTIPLIERS = frozenset((MISS, SINGLE, DOUBLE, TREBLE))
+DARTS_PER_TURN = 3
+
+
+def _dart_table(value: Callable[[int, int], object]) -> Tuple[Tuple[object, ...], ...]:
+    """value(segment, multiplier) for every dart on the board, None for anything else"""
+    return tuple(
+        tuple(
+            value(segment, multiplier)
+            if segment in VALID_SEGMENTS and not (segment == BULL and multiplier == TREBLE) else None
+            for multiplier in range(TREBLE + 1)
+        )
+        for segment in range(BULL + 1)
+    )
+
+
+def _points(segment: int, multiplier: int) -> int:
+    if segment == 0 or multiplier == MISS:
+        return 0
+    if segment == BULL:
+        return 25 if multiplier == SINGLE else 50
+    return segment * multiplier
+
+
+POINTS = _dart_table(_points)
+
+
+def validate_dart(segment: int, multiplier: int) -> None:
+    """Raise ValueError if a segment/multiplier pair is not a dart on the board"""
+    if segment not in VALID_SEGMENTS:
+        raise ValueError(f"Invalid segment: {segment}. Must be 0-20 or 25")
+
+    if multiplier not in VALID_MULTIPLIERS:
+        raise ValueError(f"Invalid multiplier: {multiplier}. Must be 0-3")
+
+    if POINTS[segment][multiplier] is None:
+        raise ValueError("Invalid dart: there is no treble bull")
+
+
+def calculate_points(segment: int, multiplier: int) -> int:
+    """Points scored by a dart"""
+    return POINTS[segment][multiplier]
+
+
+def is_bust(remaining_score: int, points: int, multiplier: int = DOUBLE) -> bool:
+    """True if a dart takes the score below zero, leaves 1, or finishes off a double (double-out)"""
+    new_score = remaining_score - points
+    if new_score == 0:
+        return multiplier != DOUBLE
+    return new_score < 2
+
+
+def is_checkout(remaining_score: int, points: int, multiplier: int) -> bool:
+    """True if a dart finishes the leg on a double, double bull included (double-out)"""
+    return remaining_score == points and multiplier == DOUBLE
+
+
+DOUBLE_OUT = 'double'
+MASTER_OUT = 'master'
+
+# Darts a leg may be opened (double-in) or finished on, by rule
+_ON_A_DOUBLE = _dart_table(lambda segment, multiplier: segment != 0 and multiplier == DOUBLE)
+_FINISHING_DARTS = {
+    DOUBLE_OUT: _ON_A_DOUBLE,
+    MASTER_OUT: _dart_table(lambda segment, multiplier: segment != 0 and multiplier in (DOUBLE, TREBLE)),
+}
+
+
+class X01Rules:
+    """One X01 variant: starting score, opening rule and finishing rule"""
+    __slots__ = ('game_type', 'starting_score', 'double_in', 'out_rule', 'opens', 'finishes', 'min_leave')
+
+    def __init__(self, game_type: str, starting_score: int, double_in: bool = False, out_rule: str = DOUBLE_OUT):
+        self.game_type = game_type
+        self.starting_score = starting_score
+        self.double_in = double_in
+        self.out_rule = out_rule
+        self.opens = _ON_A_DOUBLE
+        self.finishes = _FINISHING_DARTS[out_rule]
+        # Neither a double nor a treble can finish on 1
+        self.min_leave = 2
+
+    def __repr__(self):
+        return f'<X01Rules {self.game_type}>'
+
+    def score(self, remaining_score: int, segment: int, multiplier: int) -> Tuple[int, bool, bool]:
+        """(points, is_bust, is_checkout) for a dart thrown on remaining_score"""
+        if self.double_in and remaining_score == self.starting_score and not self.opens[segment][multiplier]:
+            # Nothing counts until the player opens on a double
+            return 0, False, False
+
+        points = POINTS[segment][multiplier]
+        new_score = remaining_score - points
+        if new_score == 0:
+            finished = self.finishes[segment][multiplier]
+            return points, not finished, finished
+        return points, new_score < self.min_leave, False
+
+
+def _variants() -> Dict[str, X01Rules]:
+    """301, 501 and 701, each straight-in or double-in and double-out or master-out"""
+    variants = {}
+    for starting_score in (301, 501, 701):
+        for double_in in (False, True):
+            for out_rule in (DOUBLE_OUT, MASTER_OUT):
+                game_type = str(starting_score) + ('-di' if double_in else '') + ('-mo' if out_rule == MASTER_OUT else '')
+                variants[game_type] = X01Rules(game_type, starting_score, double_in, out_rule)
+    return variants
+
+
+VARIANTS: Dict[str, X01Rules] = _variants()
+DEFAULT_RULES = VARIANTS['501']
+
+
+def get_rules(rules: Union[X01Rules, str, None]) -> X01Rules:
+    """Rules for a variant, given the rules themselves or a game type such as '301-di'"""
+    if rules is None:
+        return DEFAULT_RULES
+    if isinstance(rules, X01Rules):
+        return rules
+    try:
+        return VARIANTS[rules]
+    except KeyError:
+        raise ValueError(f"Unknown X01 game type: {rules}")
+
+
+class DartState:
+    """One scored dart"""
+    __slots__ = ('segment', 'multiplier', 'points', 'is_bust', 'is_checkout')
+
+    def __init__(self, segment: int, multiplier: int, points: int, is_bust: bool, is_checkout: bool):
+        self.segment = segment
+        self.multiplier = multiplier
+        self.points = points
+        self.is_bust = is_bust
+        self.is_checkout = is_checkout
+
+    def __repr__(self):
+        return f'<DartState {self.segment}x{self.multiplier}={self.points}>'
+
+
+class TurnState:
+    """Up to three darts by one player
+
+    darts holds the darts scored through this object. A turn resumed from
+    storage may have darts_thrown greater than len(darts); it can still take
+    more darts, but undo needs the full list.
+    """
+    __slots__ = ('player_id', 'turn_number', 'start_score', 'score', 'darts_thrown',
+                 'is_bust', 'is_checkout', 'darts', 'rules')
+
+    def __init__(self, player_id: int, turn_number: int, start_score: int, score: int = 0,
+                 darts_thrown: int = 0, is_bust: bool = False, is_checkout: bool = False,
+                 darts: Optional[List[DartState]] = None, rules: Optional[X01Rules] = None):
+        self.rules = rules or DEFAULT_RULES
+        self.player_id = player_id
+        self.turn_number = turn_number
+        self.start_score = start_score
+        self.score = score
+        self.darts_thrown = darts_thrown
+        self.is_bust = is_bust
+        self.is_checkout = is_checkout
+        self.darts = darts if darts is not None else []
+
+    def __repr__(self):
+        return f'<TurnState #{self.turn_number} player:{self.player_id} {self.score}/{self.remaining_score}>'
+
+    @classmethod
+    def from_darts(cls, player_id: int, turn_number: int, start_score: int,
+                   darts: Iterable[Tuple[int, int]], rules: Optional[X01Rules] = None) -> 'TurnState':
+        """Rebuild a turn by rescoring its (segment, multiplier) darts in order"""
+        turn = cls(player_id, turn_number, start_score, rules=rules)
+        for segment, multiplier in darts:
+            turn.throw(segment, multiplier)
+        return turn
+
+    @property
+    def remaining_score(self) -> int:
+        return self.start_score - self.score
+
+    @property
+    def is_open(self) -> bool:
+        """True while the player can throw another dart in this turn"""
+        return self.darts_thrown < DARTS_PER_TURN and not self.is_bust and not self.is_checkout
+
+    def throw(self, segment: int, multiplier: int) -> DartState:
+        """Score a dart against this turn"""
+        if not self.is_open:
+            raise ValueError(f"Turn {self.turn_number} is over")
+
+        points, bust, checkout = self.rules.score(self.remaining_score, segment, multiplier)
+
+        if bust:
+            # A bust scores nothing for the whole turn
+            self.is_bust = True
+            self.score = 0
+        else:
+            self.score += points
+            self.is_checkout = checkout
+
+        self.darts_thrown += 1
+        dart = DartState(segment, multiplier, points, bust, checkout)
+        self.darts.append(dart)
+        return dart
+
+    def undo(self) -> DartState:
+        """Remove the last dart and restore the turn to how it was before it"""
+        if not self.darts or len(self.darts) != self.darts_thrown:
+            raise ValueError(f"Turn {self.turn_number} has no darts to undo")
+
+        dart = self.darts.pop()
+        self.darts_thrown -= 1
+        if dart.is_bust:
+            self.is_bust = False
+            self.score = sum(earlier.points for earlier in self.darts)
+        else:
+            self.score -= dart.points
+            self.is_checkout = False
+        return dart
+
+
+class X01Leg:
+    """A whole leg held in memory: turns in order, running scores and the winner"""
+    __slots__ = ('rules', 'starting_score', 'player_ids', 'remaining', 'darts_thrown', 'turns', 'winner_id')
+
+    def __init__(self, player_ids: List[int], rules: Union[X01Rules, str, None] = None):
+        if not player_ids:
+            raise ValueError("A leg needs at least one player")
+        self.rules = get_rules(rules)
+        starting_score = self.starting_score = self.rules.starting_score
+        self.player_ids = list(player_ids)
+        self.remaining: Dict[int, int] = {player_id: starting_score for player_id in player_ids}
+        self.darts_thrown: Dict[int, int] = {player_id: 0 for player_id in player_ids}
+        self.turns: List[TurnState] = []
+        self.winner_id: Optional[int] = None
+
+    def __repr__(self):
+        return f'<X01Leg {self.rules.game_type} turns:{len(self.turns)} winner:{self.winner_id}>'
+
+    @classmethod
+    def replay(cls, player_ids: List[int], darts: Iterable[Tuple[int, int, int]],
+               rules: Union[X01Rules, str, None] = None) -> 'X01Leg':
+        """Score a sequence of (player_id, segment, multiplier) darts, raising ValueError if any is illegal"""
+        leg = cls(player_ids, rules)
+        for player_id, segment, multiplier in darts:
+            leg.throw(player_id, segment, multiplier)
+        return leg
+
+    @property
+    def is_finished(self) -> bool:
+        return self.winner_id is not None
+
+    @property
+    def current_turn(self) -> Optional[TurnState]:
+        return self.turns[-1] if self.turns else None
+
+    @property
+    def next_player_id(self) -> Optional[int]:
+        """The player due to throw next (None once the leg is won)"""
+        if self.is_finished:
+            return None
+        turn = self.current_turn
+        if turn is None:
+            return self.player_ids[0]
+        if turn.is_open:
+            return turn.player_id
+        return self.player_ids[(self.player_ids.index(turn.player_id) + 1) % len(self.player_ids)]
+
+    def throw(self, player_id: int, segment: int, multiplier: int) -> DartState:
+        """Score a dart, starting a new turn when the current one is over or someone else's"""
+        if self.is_finished:
+            raise ValueError("Leg is already finished")
+        if player_id not in self.remaining:
+            raise ValueError(f"Player {player_id} is not in this leg")
+        validate_dart(segment, multiplier)
+
+        turn = self.current_turn
+        if turn is None or not turn.is_open or turn.player_id != player_id:
+            turn = TurnState(player_id, len(self.turns) + 1, self.remaining[player_id], rules=self.rules)
+            self.turns.append(turn)
+
+        dart = turn.throw(segment, multiplier)
+        self.remaining[player_id] = turn.remaining_score
+        self.darts_thrown[player_id] += 1
+        if dart.is_checkout:
+            self.winner_id = player_id
+        return dart
+
+    def undo(self) -> Optional[DartState]:
+        """Remove the last dart in the leg (None if there is nothing to undo)"""
+        turn = self.current_turn
+        if turn is None:
+            return None
+
+        dart = turn.undo()
+        self.remaining[turn.player_id] = turn.remaining_score
+        self.darts_thrown[turn.player_id] -= 1
+        if dart.is_checkout:
+            self.winner_id = None
+        if turn.darts_thrown == 0:
+            self.turns.pop()
+        return dart
@@ -0,0 +1,74 @@
+"""Cached database liveness checks and connection pool stats
+
+Every open tablet polls the server every few seconds. The database ping
+behind those polls runs at most once per HEALTH_CACHE_SECONDS per worker
+process, and every other request in between reads the cached result, so a
+poll costs no query at all.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import Flask, current_app
+
+from app import db
+
+
+class DatabaseProbe:
+    """SELECT 1 against the main database, cached for a short TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked = 0.0
+
+    def check(self) -> Dict[str, Any]:
+        """The latest ping result, refreshed by one request at a time once it is stale"""
+        now = time.monotonic()
+        if self._result is not None and now - self._checked < self.ttl:
+            return self._cached(now)
+
+        # Whoever gets the lock pings; anyone arriving meanwhile gets the previous result
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._cached(now)
+        try:
+            if self._result is None or time.monotonic() - self._checked >= self.ttl:
+                self._result = self._ping()
+                self._checked = time.monotonic()
+            return self._cached(time.monotonic())
+        finally:
+            self._lock.release()
+
+    def _cached(self, now: float) -> Dict[str, Any]:
+        return dict(self._result, age_ms=round((now - self._checked) * 1000, 1))
+
+    @staticmethod
+    def _ping() -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(db.text('SELECT 1'))
+        except Exception as e:
+            return {'ok': False, 'error': type(e).__name__, 'latency_ms': None}
+        return {'ok': True, 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Connections in use and idle for an engine's pool (only what the pool class reports)"""
+    pool = engine.pool
+    stats = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+def database_probe() -> DatabaseProbe:
+    return current_app.extensions['health_probe']
+
+
+def init_health(app: Flask):
+    """One cached probe per app"""
+    app.extensions['health_probe'] = DatabaseProbe(app.config.get('HEALTH_CACHE_SECONDS', 2.0))
@@ -0,0 +1,86 @@
+"""Structured, queue-backed logging
+
+Records are formatted as one JSON object per line. Handlers on the request
+thread only merge the message arguments (and render a traceback, if any)
+and enqueue the record; a background QueueListener does the JSON
+formatting and the stream write.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+_listener = None
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, merging structured fields from extra={'fields': {...}}"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str, separators=(',', ':'))
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener
+
+    The stock prepare() formats the record on the calling thread and folds
+    any traceback into msg; this one only merges the arguments and keeps
+    the traceback as exc_text for JsonFormatter.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(app):
+    """Route app logging through a background queue and apply per-module levels
+    
+    Uses LOG_LEVEL for the root logger and LOG_LEVELS ({logger name: level})
+    for individual modules. Safe to call more than once per process.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(app.config.get('LOG_LEVEL', 'WARNING'))
+    for name, level in app.config.get('LOG_LEVELS', {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        return
+
+    # Handlers installed elsewhere (basicConfig, Flask defaults) write synchronously
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
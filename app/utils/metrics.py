@@ -0,0 +1,148 @@
+"""Per-request SQL and latency metrics
+
+SQLAlchemy cursor events count statements and time spent in the
+database for the current request; Flask request hooks time the whole
+request, add a Server-Timing header and feed the histograms served by
+/api/metrics in Prometheus text format.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0, 0])
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series[labels]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            lines.append(f'{self.name}{{{label_text}}} {value}')
+        return lines
+
+
+REQUEST_LABELS = ('endpoint', 'method')
+
+request_seconds = Histogram('darts_request_duration_seconds', 'Total request time',
+                            REQUEST_LABELS, SECONDS_BUCKETS)
+request_db_seconds = Histogram('darts_request_db_seconds', 'Time spent executing SQL per request',
+                               REQUEST_LABELS, SECONDS_BUCKETS)
+request_queries = Histogram('darts_request_queries', 'SQL statements executed per request',
+                            REQUEST_LABELS, QUERY_BUCKETS)
+requests_total = Counter('darts_requests_total', 'Requests served',
+                         REQUEST_LABELS + ('status',))
+cache_lookups = Counter('darts_game_cache_lookups_total', 'Game cache lookups by cache and hit or miss',
+                        ('cache', 'result'))
+
+METRICS = [request_seconds, request_db_seconds, request_queries, requests_total, cache_lookups]
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# The start time lives on the statement's execution context, so a statement
+# that raises (and never reaches after_cursor_execute) leaves nothing behind
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_started', None)
+    if started is None:
+        return
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_seconds += time.perf_counter() - started
+
+
+def init_metrics(app: Flask):
+    """Time every request and add a Server-Timing header"""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        if 'request_started' not in g:
+            return response
+
+        total = time.perf_counter() - g.request_started
+        labels = (request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+
+        request_seconds.observe(labels, total)
+        request_db_seconds.observe(labels, g.db_seconds)
+        request_queries.observe(labels, g.db_queries)
+        requests_total.inc(labels + (str(response.status_code),))
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.db_seconds * 1000:.2f};desc="{g.db_queries} queries", '
+            f'total;dur={total * 1000:.2f}'
+        )
+        return response
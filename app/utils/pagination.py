@@ -0,0 +1,21 @@
+"""Opaque keyset cursors for paginated list endpoints"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(start_time: Optional[datetime], row_id: int) -> str:
+    """Encode the (start_time, id) key of the last row on a page"""
+    key = [start_time.isoformat() if start_time else None, row_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor from encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_time, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(start_time) if start_time else None), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
@@ -0,0 +1,56 @@
+"""Helpers for depth and field selection in API responses"""
+from typing import Dict, Iterable, Optional, Set
+
+# Each nested level and the levels it needs above it
+NESTED_LEVELS = {
+    'players': (),
+    'legs': (),
+    'turns': ('legs',),
+    'throws': ('legs', 'turns'),
+}
+
+
+def parse_include(value: Optional[str], default: Iterable[str] = ()) -> Set[str]:
+    """Parse ?include=legs,turns into a set, adding the levels each one needs
+    
+    Raises ValueError for unknown names.
+    """
+    if value is None:
+        names = set(default)
+    else:
+        names = {name.strip() for name in value.split(',') if name.strip()}
+    
+    unknown = names - set(NESTED_LEVELS)
+    if unknown:
+        raise ValueError(f'Unknown include: {", ".join(sorted(unknown))}. '
+                         f'Must be one of {", ".join(NESTED_LEVELS)}')
+    
+    for name in list(names):
+        names.update(NESTED_LEVELS[name])
+    return names
+
+
+def parse_fields(value: Optional[str]) -> Optional[Dict[str, Set[str]]]:
+    """Parse ?fields=id,status,legs.id into {'': {'id', 'status'}, 'legs': {'id'}}
+    
+    Levels that are not mentioned keep all their fields.
+    """
+    if not value:
+        return None
+    
+    fields: Dict[str, Set[str]] = {}
+    for name in value.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        level, _, field = name.rpartition('.')
+        fields.setdefault(level, set()).add(field)
+    return fields
+
+
+def select_fields(data: dict, fields: Optional[Dict[str, Set[str]]], level: str = '') -> dict:
+    """Drop scalar keys that were not requested at this level (nested keys are kept)"""
+    if not fields or level not in fields:
+        return data
+    wanted = fields[level] | set(NESTED_LEVELS)
+    return {key: value for key, value in data.items() if key in wanted}
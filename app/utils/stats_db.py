@@ -0,0 +1,79 @@
+"""Separate database bind for statistics reads
+
+When SQLALCHEMY_BINDS has a 'stats' entry (STATS_DATABASE_URI), the stats
+routes and skill estimates read through their own engine: a read replica
+with its own small pool, read-only connections and a statement timeout, so
+a leaderboard refresh never waits for, or holds up, a connection that
+scoring needs. Without the bind they use the main session unchanged.
+
+A second engine on the same SQLite file stands in for a replica locally.
+"""
+from flask import Flask, g
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import db
+
+STATS_BIND = 'stats'
+
+# MySQL: max_execution_time exceeded; PostgreSQL: statement timeout
+_TIMEOUT_ERROR_CODES = (3024, '57014')
+
+
+def stats_engine():
+    """The stats bind's engine, or None when statistics share the main database"""
+    return db.engines.get(STATS_BIND)
+
+
+def stats_session():
+    """Session for statistics reads, one per app context"""
+    engine = stats_engine()
+    if engine is None:
+        return db.session
+
+    session = g.get('stats_session')
+    if session is None:
+        session = g.stats_session = Session(bind=engine)
+    return session
+
+
+def is_statement_timeout(error: OperationalError) -> bool:
+    """Whether a database error is the stats statement timeout firing"""
+    orig = error.orig
+    code = getattr(orig, 'pgcode', None) or (getattr(orig, 'args', None) or (None,))[0]
+    return code in _TIMEOUT_ERROR_CODES
+
+
+def _limit_connections(engine, timeout_ms: int) -> None:
+    """Make every stats connection read-only with a per-statement time limit"""
+    dialect = engine.dialect.name
+    if dialect not in ('mysql', 'postgresql'):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if dialect == 'mysql':
+            cursor.execute('SET SESSION TRANSACTION READ ONLY')
+            if timeout_ms:
+                cursor.execute(f'SET SESSION MAX_EXECUTION_TIME = {int(timeout_ms)}')
+        else:
+            cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+            if timeout_ms:
+                cursor.execute(f'SET statement_timeout = {int(timeout_ms)}')
+        cursor.close()
+
+
+def init_stats_db(app: Flask):
+    """Configure the stats engine, if there is one, and close its session after each request"""
+    with app.app_context():
+        engine = stats_engine()
+        if engine is not None:
+            _limit_connections(engine, app.config.get('STATS_STATEMENT_TIMEOUT_MS'))
+
+    @app.teardown_appcontext
+    def _close_stats_session(exception=None):
+        session = g.pop('stats_session', None)
+        if session is not None:
+            session.close()
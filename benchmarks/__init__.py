@@ -0,0 +1 @@
+"""Throughput benchmarks for the scoring engine and API"""
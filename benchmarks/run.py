@@ -0,0 +1,439 @@
+"""Throughput benchmark for scoring darts
+
+Simulates a number of boards each playing full 501 legs between two
+players, either straight through ScoringEngine.process_throw ("engine")
+or through the Flask test client against the throw route ("api"), and
+reports throws/sec, p50/p99 latency and SQL statements per throw.
+
+Dart choices come from a seeded generator, so every run throws exactly
+the same darts and the query counts are directly comparable.
+
+Usage:
+    python -m benchmarks.run                                  # SQLite in memory
+    python -m benchmarks.run --boards 16 --legs 5 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+    python -m benchmarks.run --database-uri mysql+pymysql://user:pw@localhost/darts_bench --workers 8
+    python -m benchmarks.run --database-uri mysql+pymysql://user:pw@localhost/darts_bench --scale 8
+
+--workers plays the boards on threads in one process. --scale runs 1, 2,
+4 ... N worker processes, each with its own app, connection pool and
+--boards boards, like gunicorn workers, and reports how throughput grows
+with the number of processes.
+
+Point --database-uri at an empty scratch database: the benchmark creates
+its own players and matches and leaves them in place.
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import sqlalchemy
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Match, Player
+from app.services.checkout_table import build_all as build_checkout_tables
+from app.services.scoring_engine import ScoringEngine
+
+MODES = ('engine', 'api')
+MAX_DARTS_PER_LEG = 300
+
+# Allowed slowdown (fraction) before a compared run counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+class QueryCounter:
+    """Counts the SQL statements the engine executes, per thread"""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, 'count', 0)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = self.count + 1
+
+
+def choose_dart(rng: random.Random, remaining: int) -> Tuple[int, int]:
+    """A plausible (segment, multiplier) for a club-level player on a score"""
+    if remaining == 50:
+        return (25, 2) if rng.random() < 0.3 else (25, 1)
+    if remaining <= 40 and remaining % 2 == 0:
+        if rng.random() < 0.4:
+            return (remaining // 2, 2)
+        return (remaining // 2, 1)
+    if remaining <= 60:
+        # Set up a double: leave 32 if possible, otherwise anything even
+        setup = remaining - 32 if remaining > 32 else 1
+        return (min(setup, 20), 1)
+
+    roll = rng.random()
+    if roll < 0.35:
+        return (20, 3)
+    if roll < 0.75:
+        return (20, 1)
+    if roll < 0.9:
+        return (rng.choice((1, 5)), 1)
+    return (19, 3)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of the samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Board:
+    """Two players working through a leg on one board, one dart at a time"""
+
+    def __init__(self, board_number: int, player_ids: List[int], seed: int, counter: QueryCounter):
+        self.board_number = board_number
+        self.player_ids = player_ids
+        self.rng = random.Random(seed * 1000 + board_number)
+        self.counter = counter
+        self.match_id = self.leg_id = None
+        self.queries = 0
+
+    def start_leg(self) -> None:
+        match = Match.create_501_match(self.player_ids)
+        leg = ScoringEngine.start_new_leg(match.id, self.player_ids[0])
+        self.match_id, self.leg_id = match.id, leg['leg']['id']
+        self.remaining = {player_id: ScoringEngine.STARTING_SCORE_501 for player_id in self.player_ids}
+        self.player_index = 0
+        self.dart_number = 1
+        self.darts = 0
+
+    def throw_next(self, throw) -> Tuple[float, bool]:
+        """Throw the next dart, returning (latency in seconds, leg finished)
+
+        throw(match_id, leg_id, player_id, segment, multiplier, dart_number)
+        records a dart and returns the engine's result dict.
+        """
+        player_id = self.player_ids[self.player_index]
+        segment, multiplier = choose_dart(self.rng, self.remaining[player_id])
+
+        queries_before = self.counter.count
+        started = time.perf_counter()
+        result = throw(self.match_id, self.leg_id, player_id, segment, multiplier, self.dart_number)
+        latency = time.perf_counter() - started
+        self.queries += self.counter.count - queries_before
+
+        self.darts += 1
+        self.remaining[player_id] = result['remaining_score']
+        if result['is_bust'] or self.dart_number == 3:
+            self.player_index = (self.player_index + 1) % len(self.player_ids)
+            self.dart_number = 1
+        else:
+            self.dart_number += 1
+
+        return latency, result['game_completed'] or self.darts >= MAX_DARTS_PER_LEG
+
+    def play_leg(self, throw) -> List[float]:
+        """Play one leg to a checkout, returning per-throw latencies"""
+        self.start_leg()
+        latencies = []
+        finished = False
+        while not finished:
+            latency, finished = self.throw_next(throw)
+            latencies.append(latency)
+        return latencies
+
+
+def engine_throw(match_id, leg_id, player_id, segment, multiplier, dart_number):
+    return ScoringEngine.process_throw(leg_id, player_id, segment, multiplier, dart_number)
+
+
+def api_throw_for(client):
+    def api_throw(match_id, leg_id, player_id, segment, multiplier, dart_number):
+        response = client.post(f'/api/matches/{match_id}/legs/{leg_id}/throw', json={
+            'player_id': player_id,
+            'segment': segment,
+            'multiplier': multiplier,
+            'dart_number': dart_number
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f'Throw failed ({response.status_code}): {response.get_json()}')
+        return response.get_json()
+    return api_throw
+
+
+def run_mode(app, mode: str, boards: List[Board], legs: int, workers: int) -> Dict:
+    """Play every board's legs in one mode and summarize the throws"""
+
+    def play(board: Board) -> List[float]:
+        with app.app_context():
+            throw = engine_throw if mode == 'engine' else api_throw_for(app.test_client())
+            latencies = []
+            for _ in range(legs):
+                latencies.extend(board.play_leg(throw))
+            db.session.remove()
+            return latencies
+
+    started = time.perf_counter()
+    latencies = []
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for board_latencies in pool.map(play, boards):
+                latencies.extend(board_latencies)
+    else:
+        # One worker interleaves darts across boards, so many legs are live at once
+        with app.app_context():
+            throw = engine_throw if mode == 'engine' else api_throw_for(app.test_client())
+            for _ in range(legs):
+                for board in boards:
+                    board.start_leg()
+                live = list(boards)
+                while live:
+                    for board in list(live):
+                        latency, finished = board.throw_next(throw)
+                        latencies.append(latency)
+                        if finished:
+                            live.remove(board)
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, sum(board.queries for board in boards))
+
+
+def summarize(latencies: List[float], elapsed: float, queries: int) -> Dict:
+    """Throughput, latency percentiles and queries per throw for a run"""
+    throws = len(latencies)
+    return {
+        'throws': throws,
+        'seconds': round(elapsed, 3),
+        'throws_per_sec': round(throws / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries_per_throw': round(queries / throws, 2) if throws else 0.0
+    }
+
+
+def _scale_worker(database_uri: str, mode: str, label: str, boards: int, legs: int, seed: int,
+                  ready, results) -> None:
+    """One worker process: its own app and pool, started together with the others"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    app = create_benchmark_app(_database_overrides(database_uri, 1))
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    worker_boards = create_boards(app, label, boards, seed, counter)
+
+    ready.wait()
+    started = time.monotonic()
+    summary = run_mode(app, mode, worker_boards, legs, 1)
+    results.put((started, time.monotonic(), summary))
+
+
+def run_scaled(database_uri: str, mode: str, label: str, processes: int, boards: int, legs: int,
+               seed: int) -> Dict:
+    """Run worker processes side by side and combine their results"""
+    context = multiprocessing.get_context('spawn')
+    ready = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_scale_worker, args=(
+            database_uri, mode, f'{label} w{index}', boards, legs, seed, ready, results
+        ))
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    finished = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    # Throughput over the wall time from the first start to the last finish
+    elapsed = max(end for _, end, _ in finished) - min(start for start, _, _ in finished)
+    summaries = [summary for _, _, summary in finished]
+    throws = sum(summary['throws'] for summary in summaries)
+    return {
+        'processes': processes,
+        'throws': throws,
+        'seconds': round(elapsed, 3),
+        'throws_per_sec': round(throws / elapsed, 1) if elapsed else 0.0,
+        # Worst worker's percentiles; the samples stay in the worker processes
+        'p50_ms': max(summary['p50_ms'] for summary in summaries),
+        'p99_ms': max(summary['p99_ms'] for summary in summaries),
+        'queries_per_throw': round(
+            sum(summary['queries_per_throw'] * summary['throws'] for summary in summaries) / throws, 2
+        ) if throws else 0.0
+    }
+
+
+def scale_steps(limit: int) -> List[int]:
+    """1, 2, 4 ... up to limit, always ending on limit"""
+    steps = []
+    processes = 1
+    while processes < limit:
+        steps.append(processes)
+        processes *= 2
+    steps.append(limit)
+    return steps
+
+
+def create_benchmark_app(overrides: Dict):
+    """Testing app with the checkout tables built up front, so its warm-up thread is not timed"""
+    app = create_app('testing', overrides)
+    build_checkout_tables()
+    return app
+
+
+def _database_overrides(database_uri: str, threads: int) -> Dict:
+    """Config overrides for a benchmark database, with a pool big enough for the threads"""
+    return {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': max(5, threads), 'pool_pre_ping': True}
+    }
+
+
+def create_boards(app, label: str, count: int, seed: int, counter: QueryCounter) -> List[Board]:
+    with app.app_context():
+        boards = []
+        for number in range(1, count + 1):
+            players = [Player.create(f'Bench {label} {number}{side}') for side in ('A', 'B')]
+            boards.append(Board(number, [player.id for player in players], seed, counter))
+        return boards
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions in results against a baseline, as readable lines"""
+    regressions = []
+    for mode, current in results.items():
+        previous = baseline.get('results', {}).get(mode)
+        if previous is None:
+            continue
+        if current['queries_per_throw'] > previous['queries_per_throw']:
+            regressions.append(
+                f"{mode}: queries/throw {previous['queries_per_throw']} -> {current['queries_per_throw']}"
+            )
+        if current['throws_per_sec'] < previous['throws_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{mode}: throws/sec {previous['throws_per_sec']} -> {current['throws_per_sec']}"
+            )
+        if current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{mode}: p99 {previous['p99_ms']}ms -> {current['p99_ms']}ms"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark throw recording throughput')
+    parser.add_argument('--boards', type=int, default=8, help='Simulated boards (default 8)')
+    parser.add_argument('--legs', type=int, default=3, help='Legs played per board (default 3)')
+    parser.add_argument('--mode', choices=MODES + ('all',), default='all')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Threads playing boards concurrently (needs --database-uri)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scale', type=int, metavar='N',
+                        help='Compare 1, 2, 4 ... N worker processes (needs --database-uri)')
+    parser.add_argument('--database-uri', help='Benchmark against this database instead of SQLite in memory')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write results to a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Fail if results regress against a baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed throughput/p99 slowdown when comparing (default 0.2)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    overrides = {}
+    if args.database_uri:
+        overrides = _database_overrides(args.database_uri, args.workers)
+    elif args.workers > 1 or args.scale:
+        # The in-memory database is one connection shared by every thread
+        print('--workers > 1 and --scale need --database-uri (SQLite in memory cannot be shared)',
+              file=sys.stderr)
+        return 2
+    
+    if args.scale:
+        return main_scaled(args)
+
+    logging.getLogger('app').setLevel(logging.WARNING)
+    app = create_benchmark_app(overrides)
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        database = db.engine.url.render_as_string(hide_password=True)
+
+    run_id = uuid.uuid4().hex[:8]
+    modes = MODES if args.mode == 'all' else (args.mode,)
+    results = {}
+    for mode in modes:
+        # Player names are unique, so tag them with the run for persistent databases
+        boards = create_boards(app, f'{mode} {run_id}', args.boards, args.seed, counter)
+        results[mode] = run_mode(app, mode, boards, args.legs, args.workers)
+        summary = results[mode]
+        print(f"{mode:>6}: {summary['throws']} throws in {summary['seconds']}s  "
+              f"{summary['throws_per_sec']} throws/s  p50 {summary['p50_ms']}ms  "
+              f"p99 {summary['p99_ms']}ms  {summary['queries_per_throw']} queries/throw")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'boards': args.boards,
+            'legs': args.legs,
+            'workers': args.workers,
+            'seed': args.seed,
+            'database': database,
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__
+        },
+        'results': results
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline written to {args.save_baseline}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differing = [key for key in ('boards', 'legs', 'seed', 'database')
+                     if baseline.get('meta', {}).get(key) != report['meta'][key]]
+        if differing:
+            print(f"Warning: baseline was run with different {', '.join(differing)}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('No regressions against baseline')
+
+    return 0
+
+
+def main_scaled(args) -> int:
+    """Throughput from 1 to --scale worker processes, one line per step"""
+    run_id = uuid.uuid4().hex[:8]
+    modes = MODES if args.mode == 'all' else (args.mode,)
+    for mode in modes:
+        baseline = None
+        for processes in scale_steps(args.scale):
+            summary = run_scaled(args.database_uri, mode, f'{mode} {run_id} x{processes}', processes,
+                                 args.boards, args.legs, args.seed)
+            baseline = baseline or summary['throws_per_sec']
+            speedup = summary['throws_per_sec'] / baseline if baseline else 0.0
+            print(f"{mode:>6} x{processes:<3}: {summary['throws']} throws in {summary['seconds']}s  "
+                  f"{summary['throws_per_sec']} throws/s ({speedup:.2f}x)  p50 {summary['p50_ms']}ms  "
+                  f"p99 {summary['p99_ms']}ms  {summary['queries_per_throw']} queries/throw")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
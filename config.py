@@ -4,6 +4,28 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def engine_options(pool_size, max_overflow, prefix='DB', isolation_level=None):
+    """Connection pool settings for one worker process (<prefix>_POOL_* and <prefix>_ISOLATION_LEVEL variables override the defaults)"""
+    options = {
+        'pool_size': int(os.environ.get(f'{prefix}_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get(f'{prefix}_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.environ.get(f'{prefix}_POOL_TIMEOUT', 10)),
+        # Recycle well inside MySQL's wait_timeout and check connections on checkout,
+        # so a restarted or idle-closed server never hands a dead connection to a throw
+        'pool_recycle': int(os.environ.get(f'{prefix}_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
+    isolation_level = os.environ.get(f'{prefix}_ISOLATION_LEVEL', isolation_level)
+    if isolation_level:
+        options['isolation_level'] = isolation_level
+    return options
+
+
+# Isolation level of the write engine (see SQLALCHEMY_ENGINE_OPTIONS)
+WRITE_ISOLATION_LEVEL = 'READ COMMITTED'
+
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-change-in-production'
@@ -18,10 +40,65 @@ class Config:
     
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     
+    # Each worker process has its own pool; keep pool_size at least the
+    # worker's thread count (WEB_THREADS in gunicorn.conf.py). Writes run at
+    # READ COMMITTED: under MySQL's default REPEATABLE READ, a dart that waited
+    # for its leg's lock would still read the turns as they were before the
+    # dart ahead of it was committed
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=5, max_overflow=10, isolation_level=WRITE_ISOLATION_LEVEL)
+    
+    # Statistics read from a replica when STATS_DATABASE_URI is set, through a
+    # small pool of their own (STATS_DB_POOL_*) with a per-statement time limit
+    STATS_DATABASE_URI = os.environ.get('STATS_DATABASE_URI')
+    SQLALCHEMY_BINDS = {
+        'stats': {'url': STATS_DATABASE_URI, **engine_options(pool_size=2, max_overflow=2, prefix='STATS_DB')}
+    } if STATS_DATABASE_URI else {}
+    STATS_STATEMENT_TIMEOUT_MS = int(os.environ.get('STATS_STATEMENT_TIMEOUT_MS', 5000))
+    
     # Session configuration
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
     
+    # Double suggested first in checkout routes (1-20, or 25 for the bull)
+    PREFERRED_DOUBLE = int(os.environ.get('PREFERRED_DOUBLE', 20))
+    
+    # Expected-darts tables (defaults to <instance>/dp_tables). Build them with
+    # `flask build-dp-tables` at deploy; WARM_DP_TABLES builds missing ones on a
+    # background thread at startup instead (in every worker, so only on in development)
+    DP_TABLE_DIR = os.environ.get('DP_TABLE_DIR')
+    WARM_DP_TABLES = os.environ.get('WARM_DP_TABLES', 'false').lower() == 'true'
+    
+    # Run `flask upgrade-db` once per deploy; startup only checks the stored
+    # schema version. Set to true to upgrade at startup instead (every worker
+    # tries, serialised by a database lock)
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', 'false').lower() == 'true'
+    
+    # Build the checkout tables on a background thread at startup instead of on first use
+    WARM_CHECKOUT_TABLE = os.environ.get('WARM_CHECKOUT_TABLE', 'true').lower() != 'false'
+    
+    # Logging: root level plus per-module overrides
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING')
+    LOG_LEVELS = {
+        'app': os.environ.get('APP_LOG_LEVEL', 'INFO'),
+        'werkzeug': 'ERROR',
+        'sqlalchemy': 'WARNING'
+    }
+    
+    # Serve /api/metrics to loopback clients only. Behind a reverse proxy, set
+    # PROXY_COUNT to the number of proxies in front of the app, so the client
+    # address is taken from X-Forwarded-For; otherwise every request looks local
+    PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
+    METRICS_LOCAL_ONLY = os.environ.get('METRICS_LOCAL_ONLY', 'true').lower() != 'false'
+    
+    # How long a database ping answers /api/health before the next one
+    HEALTH_CACHE_SECONDS = float(os.environ.get('HEALTH_CACHE_SECONDS', 2))
+    
+    # Entries in each in-process game cache (0 turns it off); with several
+    # workers, GAME_CACHE_BROKER (host:port of `flask cache-broker`) shares
+    # invalidations and live events between them
+    GAME_CACHE_SIZE = int(os.environ.get('GAME_CACHE_SIZE', 256))
+    GAME_CACHE_BROKER = os.environ.get('GAME_CACHE_BROKER')
+    
     # API settings
     JSON_SORT_KEYS = False
     JSONIFY_PRETTYPRINT_REGULAR = True
@@ -30,6 +107,9 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=2, max_overflow=3, isolation_level=WRITE_ISOLATION_LEVEL)
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', 'true').lower() != 'false'
+    WARM_DP_TABLES = os.environ.get('WARM_DP_TABLES', 'true').lower() != 'false'
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -37,11 +117,16 @@ class ProductionConfig(Config):
     SQLALCHEMY_ECHO = False
     # In production, use environment variables for all secrets
     SECRET_KEY = os.environ.get('SECRET_KEY')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=8, max_overflow=8, isolation_level=WRITE_ISOLATION_LEVEL)
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # SQLite in memory is a single shared connection, not a pool
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    LOG_LEVELS = dict(Config.LOG_LEVELS, app='WARNING')
+    SCHEMA_AUTO_UPGRADE = True
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+"""Gunicorn settings for the production server
+
+    flask upgrade-db
+    flask build-dp-tables
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Upgrade the schema and build the expected-darts tables once per deploy
+before starting the workers; they only check the schema version at startup
+(SCHEMA_AUTO_UPGRADE is off outside development) and report no live win
+probability for a skill bucket whose table is missing.
+
+Threaded workers (gthread): WEB_WORKERS processes, one per core by default,
+each serving WEB_THREADS requests at a time. Throws spend most of their
+time waiting on MySQL, so threads keep a core busy while processes spread
+the Python work across cores. Each process opens its own connection pool
+(SQLALCHEMY_ENGINE_OPTIONS in config.py); keep DB_POOL_SIZE at least
+WEB_THREADS, and WEB_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the
+server's max_connections.
+
+Each worker has its own game cache. Set GAME_CACHE_BROKER to the address of
+`flask cache-broker` so a match completed or a player renamed in one worker
+is dropped from the others too.
+
+Behind a reverse proxy, set PROXY_COUNT to the number of proxies so client
+addresses come from X-Forwarded-For; /api/metrics relies on them.
+
+Live event streams hold a thread for as long as a spectator is connected,
+so the scoring page does not open one (only ?spectate pages do); allow for
+spectators in WEB_THREADS. Without GAME_CACHE_BROKER a stream only sees
+throws recorded by its own worker process.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# The app is created after the fork, so no worker shares a database connection
+preload_app = False
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Restart workers now and then to cap slow memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'warning').lower()
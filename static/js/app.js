@@ -12,6 +12,11 @@ class DartsGame {
         this.isOnline = true;
         this.isProcessingThrow = false;
         this.lastThrowTime = 0;
+        this.gameState = null;
+        this.eventSource = null;
+        this.liveMatchId = null;
+        // Spectator screens (?spectate) follow the live event stream; the scorer fetches state itself
+        this.isSpectator = new URLSearchParams(window.location.search).has('spectate');
         
         this.init();
     }
@@ -232,43 +237,15 @@ class DartsGame {
         console.log(`Loading game state for match ${this.currentMatchId}`);
         
         try {
-            const response = await this.apiRequest(`/api/matches/${this.currentMatchId}/legs/current`);
+            // Ask only for what changed since the state already on screen
+            const previous = this.gameState;
+            const haveVersion = previous && previous.match && previous.match.id === this.currentMatchId
+                && previous.version !== null && previous.version !== undefined;
+            const query = haveVersion ? `?leg_id=${previous.leg.id}&since_version=${previous.version}` : '';
+            const response = await this.apiRequest(`/api/matches/${this.currentMatchId}/legs/current${query}`);
             console.log('Game state loaded:', response);
             
-            // Update IDs from response
-            this.currentLegId = response.leg.id;
-            this.currentPlayerId = response.current_player_id;
-            
-            // Update dart number based on current turn
-            // IMPORTANT: Don't auto-reset when turn is complete
-            if (response.current_turn && response.current_turn.throws) {
-                const throws = response.current_turn.throws;
-                this.currentDartNumber = throws.length + 1;
-                
-                // Check if turn is complete (3 darts or bust)
-                const isTurnComplete = throws.length >= 3 || response.current_turn.is_bust;
-                
-                if (isTurnComplete) {
-                    // Turn is complete - keep dart number > 3 to disable buttons
-                    // Don't reset to 1 automatically
-                    console.log(`Turn complete (${throws.length} darts, bust: ${response.current_turn.is_bust})`);
-                    this.currentTurnIsBust = response.current_turn.is_bust;
-                } else {
-                    // Turn in progress
-                    this.currentTurnIsBust = false;
-                    console.log(`Current turn has ${throws.length} throws, dart number: ${this.currentDartNumber}`);
-                }
-            } else {
-                // No current turn (just started or after next player)
-                this.currentDartNumber = 1;
-                this.currentTurnIsBust = false;
-                console.log('No current turn, starting with dart 1');
-            }
-            
-            this.updateGameDisplay(response);
-            
-            // Update button states
-            this.updateButtonStates();
+            this.applyGameState(this.mergeGameState(previous, response));
             
         } catch (error) {
             console.error('Failed to load game state:', error);
@@ -281,6 +258,148 @@ class DartsGame {
         }
     }
 
+    mergeGameState(previous, gameState) {
+        // A delta only carries the turns changed since our version; patch them into our copy
+        if (!gameState.delta || !previous || previous.leg.id !== gameState.leg.id) {
+            return gameState;
+        }
+        
+        const turns = previous.turns.slice();
+        gameState.turns.forEach(turn => {
+            const index = turns.findIndex(t => t.id === turn.id);
+            if (index >= 0) {
+                turns[index] = turn;
+            } else {
+                turns.push(turn);
+            }
+        });
+        turns.sort((a, b) => a.turn_number - b.turn_number);
+        return Object.assign({}, gameState, {
+            match: previous.match,
+            players: previous.players,
+            turns: turns,
+            delta: false
+        });
+    }
+    
+    applyGameState(gameState) {
+        // Update IDs from game state
+        this.currentLegId = gameState.leg.id;
+        this.currentPlayerId = gameState.current_player_id;
+        
+        // Update dart number based on current turn
+        // IMPORTANT: Don't auto-reset when turn is complete
+        if (gameState.current_turn && gameState.current_turn.throws) {
+            const throws = gameState.current_turn.throws;
+            this.currentDartNumber = throws.length + 1;
+            
+            // Check if turn is complete (3 darts or bust)
+            const isTurnComplete = throws.length >= 3 || gameState.current_turn.is_bust;
+            
+            if (isTurnComplete) {
+                // Turn is complete - keep dart number > 3 to disable buttons
+                // Don't reset to 1 automatically
+                console.log(`Turn complete (${throws.length} darts, bust: ${gameState.current_turn.is_bust})`);
+                this.currentTurnIsBust = gameState.current_turn.is_bust;
+            } else {
+                // Turn in progress
+                this.currentTurnIsBust = false;
+                console.log(`Current turn has ${throws.length} throws, dart number: ${this.currentDartNumber}`);
+            }
+        } else {
+            // No current turn (just started or after next player)
+            this.currentDartNumber = 1;
+            this.currentTurnIsBust = false;
+            console.log('No current turn, starting with dart 1');
+        }
+        
+        this.updateGameDisplay(gameState);
+        
+        // Update button states
+        this.updateButtonStates();
+    }
+    
+    connectLiveEvents() {
+        if (!this.isSpectator || !this.currentMatchId || this.liveMatchId === this.currentMatchId || !window.EventSource) {
+            return;
+        }
+        
+        this.disconnectLiveEvents();
+        this.liveMatchId = this.currentMatchId;
+        
+        console.log(`Subscribing to live events for match ${this.currentMatchId}`);
+        this.eventSource = new EventSource(`/api/matches/${this.currentMatchId}/events`);
+        
+        const handler = (e) => this.applyLiveEvent(JSON.parse(e.data));
+        this.eventSource.addEventListener('throw', handler);
+        this.eventSource.addEventListener('undo', handler);
+    }
+    
+    disconnectLiveEvents() {
+        if (this.eventSource) {
+            this.eventSource.close();
+        }
+        this.eventSource = null;
+        this.liveMatchId = null;
+    }
+    
+    applyLiveEvent(event) {
+        // Patch the last full game state with a throw/undo delta instead of re-fetching it
+        const state = this.gameState;
+        if (!state || event.match_id !== this.currentMatchId) return;
+        
+        if (event.leg_id !== state.leg.id || (event.turn && event.turn.is_checkout)) {
+            // New or finished leg - fetch the full state once
+            this.loadGameState();
+            return;
+        }
+        
+        if (event.type === 'throw') {
+            let turn = state.turns.find(t => t.id === event.turn.id);
+            if (!turn) {
+                turn = { throws: [] };
+                state.turns.push(turn);
+            }
+            Object.assign(turn, event.turn);
+            event.throws.forEach(throwObj => {
+                if (!turn.throws.some(t => t.id === throwObj.id)) {
+                    turn.throws.push(throwObj);
+                }
+            });
+        } else if (event.type === 'undo') {
+            if (event.turn_removed) {
+                state.turns = state.turns.filter(t => t.id !== event.turn_removed);
+            } else {
+                const turn = state.turns.find(t => t.id === event.turn.id);
+                if (turn) {
+                    Object.assign(turn, event.turn);
+                    turn.throws = turn.throws.filter(t => t.id !== event.throw_removed);
+                }
+            }
+        }
+        
+        // Only advance our version when no event was missed, so the next delta covers any gap
+        if (event.version === state.version + 1) {
+            state.version = event.version;
+        }
+        
+        // Work out whose throw it is, the same way the server does
+        const lastTurn = state.turns[state.turns.length - 1];
+        state.current_turn = null;
+        if (!lastTurn) {
+            state.current_player_id = state.leg.starting_player_id;
+        } else if (lastTurn.darts_thrown < 3 && !lastTurn.is_bust && !lastTurn.is_checkout) {
+            state.current_player_id = lastTurn.player_id;
+            state.current_turn = lastTurn;
+        } else {
+            const playerIds = state.players.map(p => p.id);
+            const nextIndex = (playerIds.indexOf(lastTurn.player_id) + 1) % playerIds.length;
+            state.current_player_id = playerIds[nextIndex];
+        }
+        
+        this.applyGameState(state);
+    }
+    
     updateTurnStatus() {
         const turnStatus = document.getElementById('turn-status');
         const dartsRemaining = document.getElementById('darts-remaining');
@@ -341,9 +460,13 @@ class DartsGame {
     }
     
     updateGameDisplay(gameState) {
+        this.gameState = gameState;
+        this.connectLiveEvents();
+        
         // Update game info
         document.getElementById('game-type').textContent = gameState.game_type;
-        document.getElementById('remaining-score').textContent = gameState.leg.remaining_score || 501;
+        const startingScore = gameState.starting_score || 501;
+        document.getElementById('remaining-score').textContent = gameState.leg.remaining_score || startingScore;
         
         // Update player scores
         const scoresContainer = document.getElementById('player-scores');
@@ -360,7 +483,7 @@ class DartsGame {
             // Calculate player's current score
             const playerTurns = gameState.turns.filter(turn => turn.player_id === player.id);
             const totalScore = playerTurns.reduce((sum, turn) => sum + turn.score, 0);
-            const remaining = 501 - totalScore;
+            const remaining = startingScore - totalScore;
             
             playerDiv.innerHTML = `
                 <div class="player-name">${player.nickname || player.name}</div>
@@ -830,6 +953,8 @@ class DartsGame {
     
     resetGameState() {
         console.log('Resetting game state');
+        this.disconnectLiveEvents();
+        this.gameState = null;
         this.currentMatchId = null;
         this.currentLegId = null;
         this.currentPlayerId = null;
@@ -875,8 +1000,11 @@ class DartsGame {
     }
         async checkConnection() {
         try {
-            // Try to make a simple request to check connection
-            await fetch('/api/players', { method: 'HEAD' });
+            // Cached server-side, so polling costs no database work
+            const response = await fetch('/api/health/ready', { cache: 'no-store' });
+            if (!response.ok) {
+                throw new Error(`Server not ready: ${response.status}`);
+            }
             
             if (!this.isOnline) {
                 this.isOnline = true;
@@ -959,7 +1087,7 @@ class DartsGame {
             this.showMessage('All offline throws synced successfully!');
         }
     }
-        async apiRequest(endpoint, method = 'GET', data = null) {
+        async apiRequest(endpoint, method = 'GET', data = null, retries = 2) {
         const options = {
             method: method,
             headers: {
@@ -975,6 +1103,12 @@ class DartsGame {
         
         const response = await fetch(endpoint, options);
         
+        // Another tablet changed the leg at the same moment; nothing was saved, so resend
+        if (response.status === 409 && retries > 0) {
+            await new Promise(resolve => setTimeout(resolve, 100 + Math.random() * 200));
+            return this.apiRequest(endpoint, method, data, retries - 1);
+        }
+        
         if (!response.ok) {
             let errorMessage = `API request failed: ${response.status} ${response.statusText}`;
             
@@ -0,0 +1,12 @@
+# wsgi.py
+"""WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Uses the production configuration unless FLASK_CONFIG names another one.
+run.py remains the single-process development server.
+"""
+import os
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))